@@ -32,11 +32,12 @@ import sys
 
 class HistoMatplotlibProducer():
 
-    def __init__(self,histo_path,filenames):
+    def __init__(self,histo_path,filenames,ncores=1):
         self.filenames  = []
         for filename in filenames:
             self.filenames.append(filename+'.py')
         self.histo_path = histo_path
+        self.ncores     = max(1,min(ncores,len(self.filenames)))
 
 
     def Execute(self):
@@ -48,6 +49,8 @@ class HistoMatplotlibProducer():
         
 
     def WriteMainFile(self):
+        if self.ncores>1:
+            return self.WriteParallelMainFile()
         output = open(self.histo_path+'/all.py','w')
         output.write('# Import all histograms\n')
         for item in self.filenames:
@@ -64,6 +67,53 @@ class HistoMatplotlibProducer():
         return True
 
 
+    def WriteParallelMainFile(self):
+        # The histograms are produced by a pool of processes, each of them
+        # importing matplotlib (with a non-interactive backend) only once.
+        # A failing histogram is reported without stopping the other ones.
+        output = open(self.histo_path+'/all.py','w')
+        output.write('import importlib\n')
+        output.write('import multiprocessing\n')
+        output.write('import traceback\n')
+        output.write('\n')
+        output.write('def initialize():\n')
+        output.write('    try:\n')
+        output.write('        import matplotlib\n')
+        output.write("        matplotlib.use('Agg')\n")
+        output.write('        import matplotlib.pyplot\n')
+        output.write('    except Exception:\n')
+        output.write('        pass # reported by each histogram\n')
+        output.write('\n')
+        output.write('def produce(name):\n')
+        output.write('    try:\n')
+        output.write('        import matplotlib.pyplot as plt\n')
+        output.write('        try:\n')
+        output.write('            getattr(importlib.import_module(name),name)()\n')
+        output.write('        finally:\n')
+        output.write("            plt.close('all')\n")
+        output.write('        return name, None\n')
+        output.write('    except Exception:\n')
+        output.write('        return name, traceback.format_exc()\n')
+        output.write('\n')
+        output.write("if __name__ == '__main__':\n")
+        output.write('    names = [\n')
+        for item in self.filenames:
+            output.write("        '"+item.split('/')[-1][:-3]+"',\n")
+        output.write('    ]\n')
+        output.write('    print("BEGIN-STAMP")\n')
+        output.write('    pool = multiprocessing.Pool('+str(self.ncores)+', initializer=initialize)\n')
+        output.write('    for name, error in pool.imap_unordered(produce, names):\n')
+        output.write('        print("- Producing histo "+name+"...")\n')
+        output.write('        if error is not None:\n')
+        output.write('            print(error)\n')
+        output.write('            print("FAILED-STAMP "+name)\n')
+        output.write('    pool.close()\n')
+        output.write('    pool.join()\n')
+        output.write('    print("END-STAMP")\n')
+        output.close()
+        return True
+
+
     def LaunchInteractiveMatplotlib(self):
         # Commands
         theCommands=[sys.executable,'all.py']
@@ -81,6 +131,13 @@ class HistoMatplotlibProducer():
         if not ok:
             logging.getLogger('MA5').error('impossible to execute MatPlotLib. For more details, see the log file:')
             logging.getLogger('MA5').error(logname)
-        return ok
+            return ok
+
+        # Histograms which failed in parallel mode
+        failed = [line.split()[1] for line in out.split('\n') if line.startswith('FAILED-STAMP ')]
+        if len(failed)!=0:
+            logging.getLogger('MA5').warning('MatPlotLib failed to produce the histograms: '+', '.join(sorted(failed)))
+            logging.getLogger('MA5').warning('For more details, see the log file: '+logname)
+        return len(failed)==0
 
 
@@ -27,6 +27,7 @@ from madanalysis.selection.instance_name      import InstanceName
 from madanalysis.IOinterface.folder_writer    import FolderWriter
 from shell_command                            import ShellCommand
 from madanalysis.enumeration.ma5_running_type import MA5RunningType
+import hashlib
 import logging
 import shutil
 import os
@@ -814,10 +815,46 @@ class JobWriter(object):
         if not result:
             logging.getLogger('MA5').error('impossible to compile the project. For more details, see the log file:')
             logging.getLogger('MA5').error(logfile)
+        else:
+            self.WriteBuildStamp()
             
         return result
 
 
+    def BuildStamp(self):
+        # Digest of the compilation settings (compiler and flags of the Makefile, architecture)
+        key = hashlib.sha1()
+        for filename in [self.path+'/Build/Makefile', self.main.archi_info.ma5dir+'/tools/architecture.ma5']:
+            try:
+                with open(filename,'rb') as source:
+                    key.update(source.read())
+            except (IOError, OSError):
+                return None
+        return key.hexdigest()
+
+
+    def WriteBuildStamp(self):
+        stamp = self.BuildStamp()
+        if stamp is None:
+            return False
+        try:
+            with open(self.path+'/Build/.buildstamp','w') as output:
+                output.write(stamp+'\n')
+        except (IOError, OSError):
+            return False
+        return True
+
+
+    def IsBuildUpToDate(self):
+        # Can the object files of the previous compilation be reused?
+        try:
+            with open(self.path+'/Build/.buildstamp','r') as source:
+                stored = source.read().strip()
+        except (IOError, OSError):
+            return False
+        return stored==self.BuildStamp()
+
+
     def MrproperJob(self):
 
         # folder
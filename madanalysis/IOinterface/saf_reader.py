@@ -0,0 +1,537 @@
+################################################################################
+#
+#  Copyright (C) 2012-2023 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+from __future__ import absolute_import
+from madanalysis.dataset.sample_info          import SampleInfo
+from madanalysis.layout.cut_info              import CutInfo
+from madanalysis.layout.histogram             import Histogram
+from madanalysis.layout.histogram_logx        import HistogramLogX
+from madanalysis.layout.histogram_frequency   import HistogramFrequency
+from collections import OrderedDict
+from itertools   import chain
+import glob
+import logging
+import os
+
+
+class SafLine(object):
+    """ Non-empty line of a SAF file, without its comment """
+    __slots__ = ['numline', 'text', 'words']
+
+    def __init__(self, numline, text, words):
+        self.numline = numline
+        self.text    = text
+        self.words   = words
+
+
+class SafBlock(object):
+    """ Block <tag> ... </tag> of a SAF file, with its lines and nested blocks """
+    __slots__ = ['tag', 'numline', 'lines', 'blocks', 'closed']
+
+    def __init__(self, tag, numline):
+        self.tag     = tag
+        self.numline = numline
+        self.lines   = []
+        self.blocks  = []
+        self.closed  = False
+
+    def Get(self, tag):
+        """ Nested blocks (first level only) with a given tag """
+        return [block for block in self.blocks if block.tag == tag]
+
+    def Find(self, tag):
+        """ Nested blocks (all levels) with a given tag, in the order of the file """
+        result = []
+        for block in self.blocks:
+            if block.tag == tag:
+                result.append(block)
+            result.extend(block.Find(tag))
+        return result
+
+    def Lines(self, nwords):
+        """ Lines of the block made of nwords words """
+        return [line for line in self.lines if len(line.words) == nwords]
+
+
+class SafFile(object):
+    """ Content of a SAF file, read in a single pass into a tree of blocks.
+        The last parsed files are kept as long as they are not modified; the
+        large histogram and cutflow files are released once extracted. """
+
+    cache   = OrderedDict()
+    maxsize = 16
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.root     = SafBlock('', 0)
+        with open(filename, 'r') as f:
+            content = f.read()
+        stack = [self.root]
+        for numline, line in enumerate(content.split('\n'), 1):
+            # Removing comments
+            index = line.find('#')
+            if index != -1:
+                line = line[:index]
+            line = line.strip()
+            if line == '':
+                continue
+            words = line.split()
+
+            # Opening and closing tags
+            if len(words) == 1 and line[0] == '<' and line[-1] == '>':
+                tag = line[1:-1].lower()
+                if tag[:1] != '/':
+                    block = SafBlock(tag, numline)
+                    stack[-1].blocks.append(block)
+                    stack.append(block)
+                else:
+                    for i in range(len(stack)-1, 0, -1):
+                        if stack[i].tag == tag[1:]:
+                            stack[i].closed = True
+                            del stack[i:]
+                            break
+                continue
+
+            stack[-1].lines.append(SafLine(numline, line, words))
+
+    @staticmethod
+    def Load(filename):
+        """ Returns the content of a SAF file, or None if it cannot be read """
+        try:
+            stat = os.stat(filename)
+            key  = (os.path.abspath(filename), stat.st_mtime, stat.st_size)
+            saf  = SafFile.cache.pop(key, None)
+            if saf is None:
+                saf = SafFile(filename)
+        except (IOError, OSError):
+            logging.getLogger('MA5').error("File called '"+filename+"' is not found")
+            return None
+        SafFile.cache[key] = saf
+        while len(SafFile.cache) > SafFile.maxsize:
+            SafFile.cache.popitem(last=False)
+        return saf
+
+    @staticmethod
+    def Release(filename):
+        """ Removes the parsed content of a file from the cache """
+        filename = os.path.abspath(filename)
+        for key in [x for x in SafFile.cache if x[0] == filename]:
+            del SafFile.cache[key]
+
+    def Find(self, tag):
+        return self.root.Find(tag)
+
+    def CheckBlock(self, tag):
+        """ Is the block found and properly closed? """
+        blocks = self.root.Find(tag)
+        return len(blocks) > 0 and blocks[-1].closed
+
+    def CheckHeaderFooter(self, label=''):
+        if not self.CheckBlock('safheader'):
+            logging.getLogger('MA5').error(label+"SAF header <SAFheader> and </SAFheader> is not found.")
+        if not self.CheckBlock('saffooter'):
+            logging.getLogger('MA5').error(label+"SAF footer <SAFfooter> and </SAFfooter> is not found.")
+
+
+    ############################################################################
+    # Conversion of the words
+    ############################################################################
+
+    def ToFloats(self, lines, first=0):
+        """ Converts the words of a set of lines with the same number of words at
+            once, starting from the word of index first. If some numbers are
+            invalid, the lines are converted word by word, the faulty words being
+            set to 0. """
+        if len(lines) == 0:
+            return []
+        try:
+            values = list(map(float, chain.from_iterable([line.words[first:] for line in lines])))
+        except ValueError:
+            return [[self.ToFloat(word, line) for word in line.words[first:]] for line in lines]
+        nwords = len(lines[0].words) - first
+        return [values[i:i+nwords] for i in range(0, len(values), nwords)]
+
+    def ToFloat(self, word, line):
+        try:
+            return float(word)
+        except ValueError:
+            logging.getLogger('MA5').error(str(word)+' must be a float value @ "'+self.filename+\
+                                           '" line='+str(line.numline))
+            return 0.
+
+    def ToInt(self, word, line):
+        try:
+            value = int(word)
+        except ValueError:
+            value = -1
+        if value < 0:
+            logging.getLogger('MA5').error(str(word)+' must be a positive integer value @ "'+\
+                                           self.filename+'" line='+str(line.numline))
+            value = 0
+        return value
+
+
+    ############################################################################
+    # Typed content
+    ############################################################################
+
+    def GetSampleInfo(self, block):
+        """ SampleInfo objects of a <SampleGlobalInfo> or <SampleDetailedInfo> block """
+        results = []
+        for line in block.Lines(5):
+            info = SampleInfo()
+            values = self.ToFloats([line])[0]
+            info.xsection      = values[0]
+            info.xerror        = values[1]
+            info.nevents       = self.ToInt(line.words[2], line)
+            info.sumw_positive = values[3]
+            info.sumw_negative = values[4]
+            results.append(info)
+        return results
+
+    def GetCounter(self, block, named=True):
+        """ CutInfo object of a <InitialCounter> or <Counter> block. The numbers
+            are preceded by the name of the cut if named is True. """
+        cutinfo = CutInfo()
+        nlines  = 0
+        for line in block.lines:
+            if named and '"' in line.text:
+                if nlines == 0:
+                    cutinfo.cutname = line.text
+                else:
+                    logging.getLogger('MA5').warning('Extra line is found: '+line.text)
+                nlines += 1
+                continue
+            if len(line.words) != 2:
+                continue
+            index  = nlines - int(named)
+            values = self.ToFloats([line])[0]
+            if index == 0:
+                cutinfo.nentries_pos, cutinfo.nentries_neg = values
+            elif index == 1:
+                cutinfo.sumw_pos, cutinfo.sumw_neg = values
+            elif index == 2:
+                cutinfo.sumw2_pos, cutinfo.sumw2_neg = values
+            else:
+                logging.getLogger('MA5').warning('Extra line is found: '+line.text)
+            nlines += 1
+        return cutinfo
+
+    def GetCutflow(self, named=True):
+        """ Initial counter and list of counters of a cutflow file. The initial
+            counter is None if it is not found. """
+        initial = self.Find('initialcounter')
+        initial = self.GetCounter(initial[-1], named=False) if len(initial) > 0 else None
+        return initial, [self.GetCounter(x, named) for x in self.Find('counter')]
+
+    def GetHisto(self, block):
+        """ Histogram, HistogramLogX or HistogramFrequency object of a <Histo>,
+            <HistoLogX> or <HistoFrequency> block """
+        if block.tag == 'histo':
+            histo = Histogram()
+        elif block.tag == 'histologx':
+            histo = HistogramLogX()
+        else:
+            histo = HistogramFrequency()
+        frequency = (block.tag == 'histofrequency')
+        logger    = logging.getLogger('MA5')
+
+        # Description: name, binning and regions
+        for description in block.Get('description'):
+            for nline, line in enumerate(description.lines):
+                if nline == 0:
+                    if len(line.text) > 1 and line.text[0] == '"' and line.text[-1] == '"':
+                        histo.name = line.text[1:-1]
+                    else:
+                        logger.error('invalid name for histogram @ line=' + str(line.numline) +' : ')
+                        logger.error(line.text)
+                elif nline == 1 and not frequency and len(line.words) == 3:
+                    histo.nbins = self.ToInt(line.words[0], line)
+                    histo.xmin  = self.ToFloat(line.words[1], line)
+                    histo.xmax  = self.ToFloat(line.words[2], line)
+                elif len(line.words) == 1:
+                    histo.regions.append(line.words[0])
+                else:
+                    logger.error('invalid region for a histogram @ line=' + str(line.numline) +' : ')
+                    logger.error(line.text)
+
+        # Statistics
+        fields = ['nevents', 'sumwentries', 'nentries', 'sumw']
+        if not frequency:
+            fields += ['sumw2', 'sumwx', 'sumw2x']
+        for statistics in block.Get('statistics'):
+            lines = statistics.Lines(2)
+            for nline, line in enumerate(lines):
+                if nline >= len(fields):
+                    logger.warning('Extra line is found: '+line.text)
+                    continue
+                if fields[nline] in ['nevents', 'nentries']:
+                    values = [self.ToInt(word, line) for word in line.words]
+                else:
+                    values = self.ToFloats([line])[0]
+                setattr(histo.positive, fields[nline], values[0])
+                setattr(histo.negative, fields[nline], values[1])
+
+        # Data
+        positive, negative, labels = [], [], []
+        for data in block.Get('data'):
+            if frequency:
+                lines = data.Lines(3)
+                for line, values in zip(lines, self.ToFloats(lines, first=1)):
+                    try:
+                        labels.append(int(line.words[0]))
+                    except ValueError:
+                        logger.error(str(line.words[0])+' must be an integer value @ "'+\
+                                     self.filename+'" line='+str(line.numline))
+                        labels.append(0)
+                    positive.append(values[0])
+                    negative.append(values[1])
+                continue
+            lines = data.Lines(2)
+            for nline, (line, values) in enumerate(zip(lines, self.ToFloats(lines))):
+                if nline == 0:
+                    histo.positive.underflow, histo.negative.underflow = values
+                elif nline == histo.nbins+1:
+                    histo.positive.overflow, histo.negative.overflow = values
+                elif nline <= histo.nbins:
+                    positive.append(values[0])
+                    negative.append(values[1])
+                else:
+                    logger.warning('Extra line is found: '+line.text)
+
+        if frequency:
+            histo.labels = labels
+        histo.positive.array = positive
+        histo.negative.array = negative
+        return histo
+
+    def GetHistos(self, parent=None):
+        """ Histogram objects of the file (or of a given block), in order """
+        parent = self.root if parent is None else parent
+        return [self.GetHisto(block) for block in parent.blocks \
+                if block.tag in ['histo', 'histologx', 'histofrequency']]
+
+
+################################################################################
+# Binary sidecars
+################################################################################
+
+class SafSidecar(object):
+    """ Binary copy (NumPy .npz file) of the content of parsed SAF files, stored
+        next to them. It is used instead of the SAF files as long as their list,
+        modification times and sizes are unchanged. NumPy is optional: without
+        it, the SAF files are always parsed. """
+
+    # to be increased whenever the layout of the sidecars changes
+    version = 1
+
+    @staticmethod
+    def Stamps(filenames):
+        return [[os.path.getmtime(x), os.path.getsize(x)] for x in filenames]
+
+    @staticmethod
+    def Read(sidecar, filenames):
+        """ Returns a dictionary of the arrays stored in the sidecar, or None if
+            it is missing or outdated. The arrays are all read at once, the
+            NpzFile reading a member again from the file at each access. """
+        try:
+            import numpy
+        except ImportError:
+            return None
+        if not os.path.isfile(sidecar):
+            return None
+        try:
+            with numpy.load(sidecar, allow_pickle=False) as f:
+                data = dict((key, f[key]) for key in f.files)
+            if int(data['version']) != SafSidecar.version or \
+               data['sources'].tolist() != [os.path.basename(x) for x in filenames] or \
+               not numpy.array_equal(data['stamps'], numpy.array(SafSidecar.Stamps(filenames)).reshape(-1,2)):
+                return None
+            return data
+        except Exception as err:
+            logging.getLogger('MA5').debug('Cannot read the sidecar '+sidecar+': '+str(err))
+            return None
+
+    @staticmethod
+    def Write(sidecar, filenames, **arrays):
+        try:
+            import numpy
+        except ImportError:
+            return
+        arrays['version'] = SafSidecar.version
+        arrays['sources'] = numpy.array([os.path.basename(x) for x in filenames], dtype=str)
+        arrays['stamps']  = numpy.array(SafSidecar.Stamps(filenames), dtype=float).reshape(-1,2)
+        try:
+            with open(sidecar+'.tmp', 'wb') as f:
+                numpy.savez(f, **arrays)
+            os.rename(sidecar+'.tmp', sidecar)
+        except Exception as err:
+            logging.getLogger('MA5').debug('Cannot write the sidecar '+sidecar+': '+str(err))
+
+
+def CheckHeaderFooter(checks, label=''):
+    """ Error messages for a missing SAF header or footer, checks being the
+        (header found, footer found) flags """
+    if not checks[0]:
+        logging.getLogger('MA5').error(label+"SAF header <SAFheader> and </SAFheader> is not found.")
+    if not checks[1]:
+        logging.getLogger('MA5').error(label+"SAF footer <SAFfooter> and </SAFfooter> is not found.")
+
+
+HISTO_KINDS = [Histogram, HistogramLogX, HistogramFrequency]
+HISTO_INTS  = ['nevents', 'nentries']
+HISTO_FLOAT = ['sumwentries', 'sumw', 'sumw2', 'sumwx', 'sumw2x', 'underflow', 'overflow']
+HISTO_FREQ  = ['sumwentries', 'sumw', 'underflow', 'overflow']
+
+def ReadHistos(filename):
+    """ Histograms of a histos.saf file and (header found, footer found) flags,
+        or None if the file cannot be read. The sidecar is filename.npz. """
+    sidecar = filename+'.npz'
+    if not os.path.isfile(filename):
+        logging.getLogger('MA5').error("File called '"+filename+"' is not found")
+        return None
+    data = SafSidecar.Read(sidecar, [filename])
+    if data is not None:
+        names          = data['names'].tolist()
+        regions        = data['regions'].tolist()
+        region_offsets = data['region_offsets'].tolist()
+        nbins          = data['nbins'].tolist()
+        ranges         = data['ranges'].tolist()
+        ints           = data['ints'].tolist()
+        floats         = data['floats'].tolist()
+        bins           = data['bins']
+        bin_offsets    = data['bin_offsets'].tolist()
+        labels         = data['labels'].tolist()
+        histos = []
+        for i, kind in enumerate(data['kinds'].tolist()):
+            histo = HISTO_KINDS[kind]()
+            histo.name    = names[i]
+            histo.regions = regions[region_offsets[i]:region_offsets[i+1]]
+            if kind != 2:
+                histo.nbins = nbins[i]
+                histo.xmin, histo.xmax = ranges[i]
+            for core, sign in [(histo.positive, 0), (histo.negative, 1)]:
+                for j, field in enumerate(HISTO_INTS):
+                    setattr(core, field, ints[i][sign][j])
+                for j, field in enumerate(HISTO_FLOAT):
+                    if kind != 2 or field in HISTO_FREQ:
+                        setattr(core, field, floats[i][sign][j])
+                core.array = bins[bin_offsets[i]:bin_offsets[i+1],sign]
+            if kind == 2:
+                histo.labels = labels[bin_offsets[i]:bin_offsets[i+1]]
+            histos.append(histo)
+        return histos, data['checks'].tolist()
+
+    saf = SafFile.Load(filename)
+    if saf is None:
+        return None
+    histos = saf.GetHistos()
+    checks = [saf.CheckBlock('safheader'), saf.CheckBlock('saffooter')]
+    SafFile.Release(filename)
+    try:
+        import numpy
+    except ImportError:
+        return histos, checks
+
+    kinds   = [HISTO_KINDS.index(type(x)) for x in histos]
+    regions = [x.regions for x in histos]
+    nbins   = [len(x.positive.array) for x in histos]
+    SafSidecar.Write(sidecar, [filename],
+        kinds          = numpy.array(kinds, dtype=int),
+        names          = numpy.array([x.name for x in histos], dtype=str),
+        regions        = numpy.array(sum(regions, []), dtype=str),
+        region_offsets = numpy.cumsum([0]+[len(x) for x in regions]),
+        nbins          = numpy.array([x.nbins for x in histos], dtype=int),
+        ranges         = numpy.array([[x.xmin, x.xmax] for x in histos], dtype=float).reshape(-1,2),
+        ints           = numpy.array([[[getattr(core, f) for f in HISTO_INTS]  for core in [x.positive, x.negative]] \
+                                      for x in histos], dtype=numpy.int64).reshape(-1,2,len(HISTO_INTS)),
+        floats         = numpy.array([[[getattr(core, f, 0.) for f in HISTO_FLOAT] for core in [x.positive, x.negative]] \
+                                      for x in histos], dtype=float).reshape(-1,2,len(HISTO_FLOAT)),
+        bins           = numpy.array([list(x) for h in histos for x in zip(h.positive.array, h.negative.array)],
+                                     dtype=float).reshape(-1,2),
+        bin_offsets    = numpy.cumsum([0]+nbins),
+        labels         = numpy.array([l for h in histos for l in (h.labels if hasattr(h, 'labels') else [0]*len(h.positive.array))],
+                                     dtype=numpy.int64),
+        checks         = numpy.array(checks, dtype=bool),
+    )
+    return histos, checks
+
+
+CUT_FIELDS = ['nentries_pos', 'nentries_neg', 'sumw_pos', 'sumw_neg', 'sumw2_pos', 'sumw2_neg']
+
+def ReadCutflows(dirname):
+    """ Cutflows of all the SAF files of a directory, as an ordered dictionary
+        file name -> (initial counter or None, counters, (header found, footer found)).
+        The sidecar is dirname.npz. """
+    filenames = sorted(os.path.normpath(x) for x in glob.glob(os.path.join(dirname, "*.saf")))
+    sidecar   = os.path.normpath(dirname)+'.npz'
+    result    = OrderedDict()
+
+    def cutinfo(values, name=''):
+        cut = CutInfo()
+        for field, value in zip(CUT_FIELDS, values):
+            setattr(cut, field, value)
+        cut.cutname = name
+        return cut
+
+    data = SafSidecar.Read(sidecar, filenames)
+    if data is not None:
+        initials    = data['initials'].tolist()
+        has_initial = data['has_initial'].tolist()
+        counters    = data['counters'].tolist()
+        names       = data['names'].tolist()
+        offsets     = data['offsets'].tolist()
+        checks      = data['checks'].tolist()
+        for i, filename in enumerate(filenames):
+            initial = cutinfo(initials[i]) if has_initial[i] else None
+            cuts    = [cutinfo(counters[j], names[j]) for j in range(offsets[i], offsets[i+1])]
+            result[filename] = (initial, cuts, checks[i])
+        return result
+
+    for filename in filenames:
+        saf = SafFile.Load(filename)
+        if saf is None:
+            continue
+        initial, cuts = saf.GetCutflow()
+        result[filename] = (initial, cuts, [saf.CheckBlock('safheader'), saf.CheckBlock('saffooter')])
+        SafFile.Release(filename)
+    if len(result) != len(filenames):
+        return result
+    try:
+        import numpy
+    except ImportError:
+        return result
+
+    items = list(result.values())
+    SafSidecar.Write(sidecar, filenames,
+        initials    = numpy.array([[getattr(x[0], f, 0.) for f in CUT_FIELDS] for x in items],
+                                  dtype=float).reshape(-1,len(CUT_FIELDS)),
+        has_initial = numpy.array([x[0] is not None for x in items], dtype=bool),
+        counters    = numpy.array([[getattr(c, f) for f in CUT_FIELDS] for x in items for c in x[1]],
+                                  dtype=float).reshape(-1,len(CUT_FIELDS)),
+        names       = numpy.array([c.cutname for x in items for c in x[1]], dtype=str),
+        offsets     = numpy.cumsum([0]+[len(x[1]) for x in items]),
+        checks      = numpy.array([x[2] for x in items], dtype=bool).reshape(-1,2),
+    )
+    return result
@@ -0,0 +1,115 @@
+################################################################################
+#
+#  Copyright (C) 2012-2023 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+from __future__ import absolute_import
+import logging
+import threading
+
+
+class BuildBudget():
+    """Number of compilation jobs shared by the components built at the same time."""
+
+    def __init__(self, ncores):
+        self.ncores    = max(1, ncores)
+        self.free      = self.ncores
+        self.condition = threading.Condition()
+
+    def Acquire(self, nactive):
+        # Fair share of the cores, given the number of components being built
+        with self.condition:
+            while self.free < 1:
+                self.condition.wait()
+            njobs = min(self.free, max(1, self.ncores // max(1, nactive)))
+            self.free -= njobs
+            return njobs
+
+    def Release(self, njobs):
+        with self.condition:
+            self.free += njobs
+            self.condition.notify_all()
+
+
+class BuildScheduler():
+    """Building a set of components in a pool of threads, each of them starting
+    once the components it depends on are successfully built.
+
+    The function building a component returns a boolean; the building stops
+    (the components already started being completed) at the first failure."""
+
+    def __init__(self, ncores):
+        self.budget  = BuildBudget(ncores)
+        self.nactive = 0
+        self.lock    = threading.Lock()
+        self.output  = threading.Lock()
+        self.logger  = logging.getLogger('MA5')
+
+    def Run(self, components, dependencies, build):
+        # components   = list of names, in the order of the sequential building
+        # dependencies = dictionary name -> names of the components required before
+        # build        = function(name) returning True if the building is successful
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        def task(name):
+            try:
+                return build(name)
+            finally:
+                with self.lock:
+                    self.nactive -= 1
+
+        done    = set()
+        pending = list(components)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.budget.ncores, len(components)))) as executor:
+            while pending or running:
+                ready = [x for x in pending if all([y in done for y in dependencies.get(x, []) if y in components])]
+                with self.lock:
+                    self.nactive += len(ready)
+                for name in ready:
+                    pending.remove(name)
+                    running[executor.submit(task, name)] = name
+                if len(running)==0:
+                    self.logger.error('circular dependencies between the components: '+', '.join(pending))
+                    return False
+                finished, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    if not future.result():
+                        pending = []
+                    else:
+                        done.add(name)
+        return len(done)==len(components)
+
+    def Jobs(self):
+        # Number of jobs to be used by a compilation
+        with self.lock:
+            nactive = self.nactive
+        return self.budget.Acquire(nactive)
+
+    def Release(self, njobs):
+        self.budget.Release(njobs)
+
+    def Log(self, messages):
+        # Displaying the messages of a component as a single block
+        with self.output:
+            for message in messages:
+                self.logger.info(message)
@@ -216,6 +216,9 @@ class MakefileWriter():
         # Options for C++ compilation
         file.write('# C++ Compilation options\n')
 
+        # - header dependencies written by the compiler next to the object files
+        file.write('DEPFLAGS  = -MMD -MP\n')
+
         # - general
         cxxflags=[]
         cxxflags.extend(['-Wall','-std=c++11','-O3','-fPIC', '-I$(MA5_BASE)/tools/']) # general
@@ -454,6 +457,7 @@ class MakefileWriter():
             else:
                file.write('HDRS += $(wildcard '+hfiles[ind]+')\n')
         file.write('OBJS  = $(SRCS:.cpp=.o)\n')
+        file.write('DEPS  = $(SRCS:.cpp=.d)\n')
         file.write('\n')
 
         # Name of the library
@@ -541,10 +545,14 @@ class MakefileWriter():
         file.write('\n')
 
         # Compile each file
-        # TO NOT FORGET HDRS -> handling header dependencies
+        # Header dependencies -> .d files produced by the compiler (DEPFLAGS),
+        # so that only the files including a modified header are recompiled
         file.write('# Compile each file\n')
-        file.write('%.o: %.cpp $(HDRS)\n')
-        file.write('\t$(CXX) $(CXXFLAGS) -o $@ -c $<\n')
+        file.write('%.o: %.cpp\n')
+        file.write('\t$(CXX) $(CXXFLAGS) $(DEPFLAGS) -o $@ -c $<\n')
+        file.write('\n')
+        file.write('# Header dependencies\n')
+        file.write('-include $(DEPS)\n')
         file.write('\n')
 
         # Link
@@ -573,7 +581,7 @@ class MakefileWriter():
         file.write('\n')
         file.write('# Do clean target\n')
         file.write('do_clean: \n')
-        file.write('\t@rm -f $(OBJS)\n')
+        file.write('\t@rm -f $(OBJS) $(DEPS)\n')
         file.write('\n')
 
         # Mr Proper
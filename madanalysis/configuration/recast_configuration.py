@@ -34,13 +34,16 @@ class RecastConfiguration:
     userVariables ={
          "status"                 : ["on","off"],\
          "CLs_numofexps"          : [str(default_CLs_numofexps)],\
+         "CLs_seed"               : ["random"],\
+         "CLs_cache"              : ["True", "False"],\
+         "PAD_jobs"               : ["1", "auto"],\
          "card_path"              : "",\
          "store_root"             : ["True", "False"] , \
          "store_events"           : ["True", "False"] , \
          "THerror_combination"    : ["quadratic","linear"], \
          "error_extrapolation"    : ["linear", "sqrt"],\
          "global_likelihoods"     : ["on","off"],\
-         "CLs_calculator_backend" : ["native", "pyhf"],\
+         "CLs_calculator_backend" : ["native", "asymptotic", "pyhf"],\
          "simplify_likelihoods"   : ["True", "False"],\
          "expectation_assumption" : ["apriori", "aposteriori"],\
          "TACO_output"            : ""
@@ -90,6 +93,9 @@ class RecastConfiguration:
                 dico_file.close()
 
         self.CLs_numofexps= 100000
+        self.CLs_seed     = None
+        self.CLs_cache    = True
+        self.PAD_jobs     = 1
         self.card_path= ""
         self.logger = logging.getLogger('MA5')
 
@@ -102,6 +108,9 @@ class RecastConfiguration:
             self.user_DisplayParameter("padtune")
             self.user_DisplayParameter("padsfs")
             self.user_DisplayParameter("CLs_numofexps")
+            self.user_DisplayParameter("CLs_seed")
+            self.user_DisplayParameter("CLs_cache")
+            self.user_DisplayParameter("PAD_jobs")
             self.user_DisplayParameter("card_path")
             self.user_DisplayParameter("store_events")
             self.user_DisplayParameter("TACO_output")
@@ -151,6 +160,17 @@ class RecastConfiguration:
         elif parameter=="CLs_numofexps":
             self.logger.info("   * Number of toy experiments for the CLs calculation: "+str(self.CLs_numofexps))
             return
+        elif parameter=="CLs_seed":
+            self.logger.info("   * Seed of the toy experiments for the CLs calculation: "+\
+                             ("random" if self.CLs_seed is None else str(self.CLs_seed)))
+            return
+        elif parameter=="CLs_cache":
+            self.logger.info("   * Reusing the CLs results of unchanged signal regions: "+str(self.CLs_cache))
+            return
+        elif parameter=="PAD_jobs":
+            self.logger.info("   * Number of datasets analysed simultaneously by the PAD: "+\
+                             ("auto" if self.PAD_jobs is None else str(self.PAD_jobs)))
+            return
         elif parameter=="card_path":
             self.logger.info("   * Path to a recasting card: "+str(self.card_path))
             return
@@ -192,6 +212,7 @@ class RecastConfiguration:
         elif parameter=="CLs_calculator_backend":
             self.logger.info("   * Exclusion limits will be calculated with " +
                              (self.CLs_calculator_backend == "native")*' MadAnalysis 5 native calculator'+ \
+                             (self.CLs_calculator_backend == "asymptotic")*' the asymptotic CLs calculator'+ \
                              (self.CLs_calculator_backend == "pyhf")*' pyhf (if available)'+'.')
             return
         elif parameter=="simplify_likelihoods":
@@ -295,6 +316,51 @@ class RecastConfiguration:
                 return
             self.CLs_numofexps = int(value)
 
+        # Seed of the toy experiments
+        elif parameter=="CLs_seed":
+            if self.status!="on":
+                self.logger.error("Please first set the recasting mode to 'on'.")
+                return
+            if value.lower() == "random":
+                self.CLs_seed = None
+                return
+            try:
+                seed = int(value)
+            except:
+                seed = -1
+            if seed < 0:
+                self.logger.error("The seed of the toy experiments must be 'random' or a non-negative integer.")
+                return
+            self.CLs_seed = seed
+
+        # Persistent cache of the CLs results
+        elif parameter=="CLs_cache":
+            if self.status!="on":
+                self.logger.error("Please first set the recasting mode to 'on'.")
+                return
+            if value.lower() in ["true", "false"]:
+                self.CLs_cache = (value.lower() == "true")
+            else:
+                self.logger.error("Please type either True or False.")
+                return
+
+        # Number of datasets analysed simultaneously by the PAD
+        elif parameter=="PAD_jobs":
+            if self.status!="on":
+                self.logger.error("Please first set the recasting mode to 'on'.")
+                return
+            if value.lower() == "auto":
+                self.PAD_jobs = None
+                return
+            try:
+                njobs = int(value)
+            except:
+                njobs = 0
+            if njobs < 1:
+                self.logger.error("The number of PAD jobs must be 'auto' or a positive integer.")
+                return
+            self.PAD_jobs = njobs
+
         # path to a recasting card
         elif parameter=="card_path":
             if self.status!="on":
@@ -415,7 +481,7 @@ class RecastConfiguration:
             if self.status!="on":
                 self.logger.error("Please first set the recasting mode to 'on'.")
                 return
-            if value.lower() in ["native", "pyhf"]:
+            if value.lower() in ["native", "asymptotic", "pyhf"]:
                 if value.lower() == "pyhf":
                     # if self.session_info.has_pyhf:
                     self.CLs_calculator_backend = "pyhf"
@@ -423,11 +489,15 @@ class RecastConfiguration:
                     # else:
                     #     self.logger.error("Please install pyhf first by typing `install pyhf`")
                     #     return
+                elif value.lower() == "asymptotic":
+                    self.CLs_calculator_backend = "asymptotic"
+                    self.logger.warning("Exclusion limits will be computed in the asymptotic limit, " + \
+                                        "which may be inaccurate for small event counts.")
                 else:
                     self.CLs_calculator_backend = "native"
             else:
                 self.logger.error("Unknown calculator "+str(value)+\
-                                  ". Please choose between native or pyhf")
+                                  ". Please choose between native, asymptotic or pyhf")
                 return
 
         #Set simplified likelihoods
@@ -473,7 +543,7 @@ class RecastConfiguration:
             if var == "add":
                 table = ["extrapolated_luminosity", "systematics"]
             else:
-                table = ["CLs_numofexps", "card_path", "store_events", 'TACO_output', "add",
+                table = ["CLs_numofexps", "CLs_seed", "CLs_cache", "PAD_jobs", "card_path", "store_events", 'TACO_output', "add",
                          "THerror_combination", "error_extrapolation", "global_likelihoods",
                          "CLs_calculator_backend", "expectation_assumption"]#, "simplify_likelihoods"
         else:
@@ -487,6 +557,12 @@ class RecastConfiguration:
                 table.extend(RecastConfiguration.userVariables["status"])
         elif variable =="CLs_numofexps":
                 table.extend(RecastConfiguration.userVariables["CLs_numofexps"])
+        elif variable =="CLs_seed":
+                table.extend(RecastConfiguration.userVariables["CLs_seed"])
+        elif variable =="CLs_cache":
+                table.extend(RecastConfiguration.userVariables["CLs_cache"])
+        elif variable =="PAD_jobs":
+                table.extend(RecastConfiguration.userVariables["PAD_jobs"])
         elif variable =="card_path":
                 table.extend(RecastConfiguration.userVariables["card_path"])
         elif variable =="store_root":
@@ -46,6 +46,7 @@ class MA5mode():
       self.scriptmode     = False
       self.debug          = False
       self.build          = False
+      self.verify         = False
       self.developer_mode = False
 
 
@@ -129,7 +130,7 @@ def DecodeArguments(version, date):
                                      "PHReEvhfmsbdqi", \
                                      ["partonlevel","hadronlevel","recolevel",\
                                       "expert","version","release","help",\
-                                      "forced","script","debug","build","qmode","installcard"])
+                                      "forced","script","debug","build","verify","qmode","installcard"])
     except getopt.GetoptError as err:
         logging.getLogger('MA5').error(str(err))
         Usage()
@@ -159,6 +160,8 @@ def DecodeArguments(version, date):
             mode.debug = True
         elif o in ["-b","--build"]:
             mode.build = True
+        elif o in ["--verify"]:
+            mode.verify = True
         elif o in ["-q","--qmode"]:
             mode.developer_mode = True
             print("")
@@ -267,7 +270,7 @@ def MainSession(mode,arglist,ma5dir,version,date):
         sys.exit()
 
     # Building (if necesserary) the SampleAnalyzer library
-    if not main.BuildLibrary(forced=mode.build):
+    if not main.BuildLibrary(forced=mode.build, verify=mode.verify):
         sys.exit()
 
     # Checking the present configuration
@@ -362,6 +365,7 @@ def Usage():
     logging.getLogger('MA5').info(" -v or --version")
     logging.getLogger('MA5').info("    or --release     : display the version number of MadAnalysis")
     logging.getLogger('MA5').info(" -b or --build       : rebuild the SampleAnalyzer static library")
+    logging.getLogger('MA5').info("       --verify      : run the SampleAnalyzer test program even if the libraries are unchanged")
     logging.getLogger('MA5').info(" -f or --forced      : do not ask for confirmation when MA5 removes "+\
                                   "a directory or overwrites an object") 
     logging.getLogger('MA5').info(" -s or --script      : quit automatically MA5 when the script is loaded")
@@ -26,6 +26,8 @@ from __future__ import absolute_import
 from madanalysis.system.architecture_info import ArchitectureInfo
 import logging
 import glob
+import hashlib
+import json
 import os
 import sys
 
@@ -98,4 +100,59 @@ class LibraryBuilder:
         
     def compare(self):
         return self.archi_info.Compare(self.archi_info_stored)
+
+
+    def stampFile(self):
+        return os.path.normpath(self.archi_info.ma5dir+'/tools/SampleAnalyzer/Lib/build_stamp.json')
+
+
+    def buildStamp(self):
+        # Digest of the stored architecture and state of the built libraries and test program
+        stamp = {}
+        try:
+            with open(self.archi_info.ma5dir+'/tools/architecture.ma5','rb') as source:
+                stamp['architecture'] = hashlib.sha1(source.read()).hexdigest()
+        except (IOError, OSError):
+            return None
+        files = sorted(glob.glob(self.archi_info.ma5dir+'/tools/SampleAnalyzer/Lib/lib*_for_ma5.*'))
+        files.append(self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/TestSampleAnalyzer')
+        stamp['files'] = {}
+        for filename in files:
+            try:
+                info = os.stat(filename)
+            except OSError:
+                return None
+            stamp['files'][os.path.normpath(filename)] = [info.st_mtime, info.st_size]
+        return stamp
+
+
+    def checkStamp(self):
+        # Is the test program validated for the present libraries?
+        stamp = self.buildStamp()
+        if stamp is None:
+            return False
+        try:
+            with open(self.stampFile(),'r') as source:
+                stored = json.load(source)
+        except (IOError, OSError, ValueError):
+            self.logger.debug('-> no valid build stamp found.')
+            return False
+        if stored!=stamp:
+            self.logger.debug('-> the build stamp is outdated.')
+            return False
+        return True
+
+
+    def writeStamp(self):
+        stamp = self.buildStamp()
+        if stamp is None:
+            return False
+        try:
+            with open(self.stampFile()+'.tmp','w') as output:
+                json.dump(stamp, output, indent=1)
+            os.replace(self.stampFile()+'.tmp', self.stampFile())
+        except (IOError, OSError) as err:
+            self.logger.debug('impossible to write the build stamp: '+str(err))
+            return False
+        return True
         
@@ -59,6 +59,7 @@ class Main():
         "currentdir": [],
         "normalize": ["none", "lumi", "lumi_weight"],
         "graphic_render": ["root", "matplotlib", "none"],
+        "incremental_report": ["on", "off"],
         "lumi": [],
         "stacking_method": ["stack", "superimpose", "normalize2one"],
         "outputfile": ['"output.lhe.gz"', '"output.lhco.gz"'],
@@ -108,6 +109,7 @@ class Main():
         self.isolation      = IsolationConfiguration()
         self.output         = ""
         self.graphic_render = GraphicRenderType.NONE
+        self.incremental_report = "off"
         if self.mode==MA5RunningType.RECO:
             self.normalize = NormalizeType.NONE
         else:
@@ -212,6 +214,7 @@ class Main():
         self.logger.info(" *********************************" )
         self.user_DisplayParameter("currentdir")
         self.user_DisplayParameter("graphic_render")
+        self.user_DisplayParameter("incremental_report")
         self.user_DisplayParameter("normalize")
         self.user_DisplayParameter("lumi")
         self.user_DisplayParameter("outputfile")
@@ -263,6 +266,9 @@ class Main():
             elif self.graphic_render==GraphicRenderType.MATPLOTLIB:
                 word="matplotlib"
             self.logger.info(" graphic renderer = " + word)
+        elif parameter=="incremental_report":
+            self.logger.info(" reuse of the unchanged plots and reports of the previous job = " + \
+                             self.incremental_report)
         elif parameter=="outputfile":
             if self.output=="":
                 msg="none"
@@ -347,6 +353,14 @@ class Main():
                 self.logger.error("'graphic_render' possible values are : 'none', 'root', 'matplotlib'")
                 return False
 
+        # incremental_report
+        elif parameter=="incremental_report":
+            if value in ["on", "off"]:
+                self.incremental_report = value
+            else:
+                self.logger.error("'incremental_report' possible values are : 'on', 'off'")
+                return False
+
         # lumi
         elif (parameter=="lumi"):
             try:
@@ -451,9 +465,8 @@ class Main():
             return False
         if not checkup.CheckSessionInfo():
             return False
-        if not checkup.CheckMandatoryPackages():
-            return False
-        if not checkup.CheckOptionalProcessingPackages():
+        if not checkup.CheckPackages('processing', [checkup.CheckMandatoryPackages,
+                                                    checkup.CheckOptionalProcessingPackages]):
             return False
         if not checkup.SetFolder():
             return False
@@ -467,12 +480,9 @@ class Main():
         if not checkup.ReadUserOptions():
             return False
 
-        # Reinterpretation packages
-        if not checkup.CheckOptionalReinterpretationPackages():
-            return False
-
-        # Graphical packages
-        if not checkup.CheckOptionalGraphicalPackages():
+        # Reinterpretation and graphical packages
+        if not checkup.CheckPackages('reinterpretation', [checkup.CheckOptionalReinterpretationPackages,
+                                                          checkup.CheckOptionalGraphicalPackages]):
             return False
         self.AutoSetGraphicalRenderer()
 
@@ -495,7 +505,78 @@ class Main():
         return True
 
 
-    def BuildLibrary(self,forced=False):
+    def BuildComponent(self, compiler, scheduler, libraries, ind):
+        # Building one library or test program (the messages are displayed once it is built)
+        isLibrary=not libraries[ind][5]
+        if isLibrary:
+            product='library'
+        else:
+            product='test program'
+        messages = ["   **********************************************************",
+                    "   Component "+str(ind+1)+"/"+str(len(libraries))+" - "+product+": "+libraries[ind][1]]
+        def abort(message):
+            scheduler.Log(messages)
+            self.logger.error(message)
+            return False
+
+        # Cleaning the project
+        messages.append("     - Cleaning the project before building the "+product+" ...")
+        if not compiler.MrProper(libraries[ind][2],libraries[ind][4]):
+            return abort("The "+product+" building aborted.")
+
+        # Compiling (with the share of the cores available for this component)
+        messages.append("     - Compiling the source files ...")
+        njobs = scheduler.Jobs()
+        try:
+            compiled = compiler.Compile(njobs,libraries[ind][2],libraries[ind][4])
+        finally:
+            scheduler.Release(njobs)
+        if not compiled:
+            return abort("The "+product+" building aborted.")
+
+        # Linking
+        messages.append("     - Linking the "+product+" ...")
+        if not compiler.Link(libraries[ind][2],libraries[ind][4]):
+            return abort("The "+product+" building aborted.")
+
+        # Checking
+        messages.append("     - Checking that the "+product+" is properly built ...")
+        if not os.path.isfile(libraries[ind][3]):
+            return abort("The "+product+" '"+libraries[ind][3]+"' is not produced.")
+
+        # Cleaning the project
+        messages.append("     - Cleaning the project after building the "+product+" ...")
+        if not compiler.Clean(libraries[ind][2],libraries[ind][4]):
+            return abort("library building aborted.")
+
+        if not isLibrary:
+
+            # Running the program test
+            messages.append("     - Running the test program ...")
+            program=libraries[ind][3].split('/')[-1]
+
+            argv = []
+            if program=='TestSampleAnalyzer':
+                argv = [self.archi_info.ma5dir+'/tools/SampleAnalyzer/Test/Process/dummy_list.txt']
+            if not compiler.Run(program,argv,self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/'):
+                return abort("the test failed.")
+
+            # Checking the program output
+            messages.append("     - Checking the program output...")
+            if libraries[ind][0]=="configuration":
+                if not compiler.CheckRunConfiguration(program,self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/'):
+                    return abort("the test failed.")
+            else:
+                if not compiler.CheckRun(program,self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/'):
+                    return abort("the test failed.")
+
+        # Print Ok
+        messages.append('      => Status: \x1b[32m'+'[OK]'+'\x1b[0m')
+        scheduler.Log(messages)
+        return True
+
+
+    def BuildLibrary(self,forced=False,verify=False):
         builder = LibraryBuilder(self.archi_info)
         UpdateNeed=False
         FirstUse, Missing = builder.checkMA5()
@@ -512,6 +593,11 @@ class Main():
         if not rebuild:
             self.logger.info('  => MadAnalysis libraries found.')
 
+            # Test program already run successfully with the same libraries
+            if not verify and builder.checkStamp():
+                self.logger.info('  => MadAnalysis test program already validated.')
+                return True
+
             # Test the program
             if not os.path.isfile(self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/TestSampleAnalyzer'):
                 FirstUse=True
@@ -528,6 +614,7 @@ class Main():
 
         if not rebuild:
             self.logger.info('  => MadAnalysis test program works.')
+            builder.writeStamp()
             return True
 
         # Compile library
@@ -664,74 +751,24 @@ class Main():
             self.logger.error("test program building aborted.")
             sys.exit()
 
-        # Compiling the libraries
-        for ind in range(0,len(libraries)):
-
-            isLibrary=not libraries[ind][5]
-            if isLibrary:
-                product='library'
-            else:
-                product='test program'
-
-            self.logger.info("   **********************************************************")
-            self.logger.info("   Component "+str(ind+1)+"/"+str(len(libraries))+" - "+product+": "+libraries[ind][1])
-
-             # Cleaning the project
-            self.logger.info("     - Cleaning the project before building the "+product+" ...")
-            if not compiler.MrProper(libraries[ind][2],libraries[ind][4]):
-                self.logger.error("The "+product+" building aborted.")
-                sys.exit()
-
-            # Compiling
-            self.logger.info("     - Compiling the source files ...")
-            if not compiler.Compile(ncores,libraries[ind][2],libraries[ind][4]):
-                self.logger.error("The "+product+" building aborted.")
-                sys.exit()
-
-            # Linking
-            self.logger.info("     - Linking the "+product+" ...")
-            if not compiler.Link(libraries[ind][2],libraries[ind][4]):
-                self.logger.error("The "+product+" building aborted.")
-                sys.exit()
-
-            # Checking
-            self.logger.info("     - Checking that the "+product+" is properly built ...")
-            if not os.path.isfile(libraries[ind][3]):
-                self.logger.error("The "+product+" '"+libraries[ind][3]+"' is not produced.")
-                sys.exit()
-
-             # Cleaning the project
-            self.logger.info("     - Cleaning the project after building the "+product+" ...")
-            if not compiler.Clean(libraries[ind][2],libraries[ind][4]):
-                self.logger.error("library building aborted.")
-                sys.exit()
-
-            if not isLibrary:
-
-                # Running the program test
-                self.logger.info("     - Running the test program ...")
-                program=libraries[ind][3].split('/')[-1]
-
-                argv = []
-                if program=='TestSampleAnalyzer':
-                    argv = [self.archi_info.ma5dir+'/tools/SampleAnalyzer/Test/Process/dummy_list.txt']
-                if not compiler.Run(program,argv,self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/'):
-                    self.logger.error("the test failed.")
-                    sys.exit()
-
-                # Checking the program output
-                self.logger.info("     - Checking the program output...")
-                if libraries[ind][0]=="configuration":
-                    if not compiler.CheckRunConfiguration(program,self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/'):
-                        self.logger.error("the test failed.")
-                        sys.exit()
-                else:    
-                    if not compiler.CheckRun(program,self.archi_info.ma5dir+'/tools/SampleAnalyzer/Bin/'):
-                        self.logger.error("the test failed.")
-                        sys.exit()
-
-            # Print Ok
-            self.logger.info('      => Status: \x1b[32m'+'[OK]'+'\x1b[0m')
+        # Compiling the libraries and the test programs, the independent ones at the same time
+        # (the interfaces rely on commons, process on the interfaces and each test program on its library)
+        packages     = [library[2] for library in libraries]
+        dependencies = {'commons'       : ['configuration'],
+                        'zlib'          : ['commons'],
+                        'fastjet'       : ['commons'],
+                        'delphes'       : ['commons'],
+                        'delphesMA5tune': ['commons'],
+                        'root'          : ['commons', 'delphes', 'delphesMA5tune'],
+                        'process'       : ['commons', 'zlib', 'fastjet', 'delphes', 'delphesMA5tune', 'root']}
+        for package in packages:
+            if package.startswith('test_'):
+                dependencies[package] = [package[5:]]
+        from madanalysis.build.build_scheduler import BuildScheduler
+        scheduler = BuildScheduler(ncores)
+        if not scheduler.Run(packages, dependencies,
+                             lambda package: self.BuildComponent(compiler, scheduler, libraries, packages.index(package))):
+            sys.exit()
 
         self.logger.info("   **********************************************************")
 
@@ -739,6 +776,9 @@ class Main():
         chrono.Stop()
         self.logger.info("   Elapsed time = "+chrono.Display())
 
+        # All the test programs work with the new libraries
+        builder.writeStamp()
+
         self.logger.info("   **********************************************************")
         self.logger.info("")
 
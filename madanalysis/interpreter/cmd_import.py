@@ -221,7 +221,9 @@ class CmdImport(CmdBase.CmdBase):
         layout.GenerateReport(history,htmlpath,ReportFormatType.HTML)
         self.logger.info("     -> To open this HTML report, please type 'open'.")
 
-        # PDF report
+        # Generating the sources of the PDF and DVI reports, which are then
+        # compiled at the same time
+        latex_reports = []
         if self.main.session_info.has_pdflatex:
 
             # Getting output filename for PDF report
@@ -233,19 +235,11 @@ class CmdImport(CmdBase.CmdBase):
 
             # Generating the PDF report
             layout.GenerateReport(history,pdfpath,ReportFormatType.PDFLATEX)
-            layout.CompileReport(ReportFormatType.PDFLATEX,pdfpath)
+            latex_reports.append([ReportFormatType.PDFLATEX,pdfpath])
 
-            # Displaying message for opening PDF
-            if self.main.currentdir in pdfpath:
-                pdfpath = pdfpath[len(self.main.currentdir):]
-            if pdfpath[0]=='/':
-                pdfpath=pdfpath[1:]
-            self.logger.info("     -> To open this PDF report, please type 'open " + pdfpath + "'.")
-            
         else:
             self.logger.warning("pdflatex not installed -> no PDF report.")
 
-        # DVI/PDF report
         if self.main.session_info.has_latex:
 
             # Getting output filename for DVI report
@@ -261,20 +255,31 @@ class CmdImport(CmdBase.CmdBase):
 
             # Generating the DVI report
             layout.GenerateReport(history,dvipath,ReportFormatType.LATEX)
-            layout.CompileReport(ReportFormatType.LATEX,dvipath)
-
-            # Displaying message for opening DVI
-            if self.main.session_info.has_dvipdf:
-                pdfpath = os.path.expanduser(args[0]+'/DVI')
-                if self.main.currentdir in pdfpath:
-                    pdfpath = pdfpath[len(self.main.currentdir):]
-                if pdfpath[0]=='/':
-                    pdfpath=pdfpath[1:]
-                self.logger.info("     -> To open this PDF report, please type 'open " + pdfpath + "'.")
-                
+            latex_reports.append([ReportFormatType.LATEX,dvipath])
+
         else:
             self.logger.warning("latex not installed -> no DVI/PDF report.")
 
+        # Compiling the reports
+        layout.CompileReports(latex_reports)
+
+        # Displaying message for opening PDF
+        if self.main.session_info.has_pdflatex:
+            if self.main.currentdir in pdfpath:
+                pdfpath = pdfpath[len(self.main.currentdir):]
+            if pdfpath[0]=='/':
+                pdfpath=pdfpath[1:]
+            self.logger.info("     -> To open this PDF report, please type 'open " + pdfpath + "'.")
+
+        # Displaying message for opening DVI
+        if self.main.session_info.has_latex and self.main.session_info.has_dvipdf:
+            pdfpath = os.path.expanduser(args[0]+'/DVI')
+            if self.main.currentdir in pdfpath:
+                pdfpath = pdfpath[len(self.main.currentdir):]
+            if pdfpath[0]=='/':
+                pdfpath=pdfpath[1:]
+            self.logger.info("     -> To open this PDF report, please type 'open " + pdfpath + "'.")
+
 
 
 
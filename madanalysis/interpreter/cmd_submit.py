@@ -278,47 +278,39 @@ class CmdSubmit(CmdBase):
         layout.GenerateReport(history,htmlpath,ReportFormatType.HTML)
         self.logger.info("     -> To open this HTML report, please type 'open'.")
 
-        # PDF report
+        # Generating the sources of the PDF and DVI reports, which are then
+        # compiled at the same time
+        latex_reports = []
         if self.main.session_info.has_pdflatex:
-
-            # Generating the PDF report
             self.logger.info("   Generating the PDF report ...")
             layout.GenerateReport(history,pdfpath,ReportFormatType.PDFLATEX)
-            layout.CompileReport(ReportFormatType.PDFLATEX,pdfpath)
-
-            # Displaying message for opening PDF
-            if self.main.currentdir in pdfpath:
-                pdfpath = pdfpath[len(self.main.currentdir):]
-            if pdfpath[0]=='/':
-                pdfpath=pdfpath[1:]
-            self.logger.info("     -> To open this PDF report, please type 'open " + pdfpath + "'.")
-
+            latex_reports.append([ReportFormatType.PDFLATEX,pdfpath])
         else:
             self.logger.warning("pdflatex not installed -> no PDF report.")
-
-        # DVI/PDF report
         if self.main.session_info.has_latex:
-
-            # Warning message for DVI -> PDF
             self.logger.info("   Generating the DVI report ...")
-#            if not self.main.session_info.has_dvipdf:
-#               self.logger.warning("dvipdf not installed -> the DVI report will not be converted to a PDF file.")
-
-            # Generating the DVI report
             layout.GenerateReport(history,dvipath,ReportFormatType.LATEX)
-            layout.CompileReport(ReportFormatType.LATEX,dvipath)
-
-            # Displaying message for opening DVI
-            if self.main.session_info.has_dvipdf:
-                pdfpath = os.path.expanduser(args[0]+'/Output/DVI/MadAnalysis5job_'+str(i))
-                if self.main.currentdir in pdfpath:
-                    pdfpath = pdfpath[len(self.main.currentdir):]
-                if pdfpath[0]=='/':
-                    pdfpath=pdfpath[1:]
-                self.logger.info("     -> To open the corresponding Latex file, please type 'open " + pdfpath + "'.")
-
+            latex_reports.append([ReportFormatType.LATEX,dvipath])
         else:
             self.logger.warning("latex not installed -> no DVI/PDF report.")
+        layout.CompileReports(latex_reports)
+
+        # Displaying message for opening PDF
+        if self.main.session_info.has_pdflatex:
+            if self.main.currentdir in pdfpath:
+                pdfpath = pdfpath[len(self.main.currentdir):]
+            if pdfpath[0]=='/':
+                pdfpath=pdfpath[1:]
+            self.logger.info("     -> To open this PDF report, please type 'open " + pdfpath + "'.")
+
+        # Displaying message for opening DVI
+        if self.main.session_info.has_latex and self.main.session_info.has_dvipdf:
+            pdfpath = os.path.expanduser(args[0]+'/Output/DVI/MadAnalysis5job_'+str(i))
+            if self.main.currentdir in pdfpath:
+                pdfpath = pdfpath[len(self.main.currentdir):]
+            if pdfpath[0]=='/':
+                pdfpath=pdfpath[1:]
+            self.logger.info("     -> To open the corresponding Latex file, please type 'open " + pdfpath + "'.")
 
 
 
@@ -415,10 +407,14 @@ class CmdSubmit(CmdBase):
                 return False
 
         if self.resubmit and not self.main.recasting.status=='on':
-            self.logger.info("   Cleaning 'SampleAnalyzer'...")
-            if not jobber.MrproperJob():
-                self.logger.error("job submission aborted.")
-                return False
+            # Only the modified files are recompiled if the compilation settings are unchanged
+            if jobber.IsBuildUpToDate():
+                self.logger.info("   Keeping the files compiled during the previous submission...")
+            else:
+                self.logger.info("   Cleaning 'SampleAnalyzer'...")
+                if not jobber.MrproperJob():
+                    self.logger.error("job submission aborted.")
+                    return False
 
         if not self.main.recasting.status=='on':
             self.logger.info("   Compiling 'SampleAnalyzer'...")
@@ -0,0 +1,129 @@
+################################################################################
+#  
+#  Copyright (C) 2012-2023 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#  
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#  
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#  
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#  
+################################################################################
+
+
+
+
+# Rendering of the selection histograms with matplotlib. This module is
+# standalone: it is copied into the histogram folder of each job, next to the
+# histos.json (figure settings) and histos.npz (binning and weights) files
+# written by PlotFlow, and called by the selection_N.py scripts.
+
+from __future__ import absolute_import
+import json
+import os
+
+data = {}
+
+
+def Load():
+    """ Settings and arrays of all the histograms of the folder (read once) """
+    if len(data)==0:
+        import numpy
+        path = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(path,'histos.json')) as jsonfile:
+            data['settings'] = json.load(jsonfile)
+        data['arrays'] = numpy.load(os.path.join(path,'histos.npz'))
+    return data['settings'], data['arrays']
+
+
+def Draw(name):
+    """ Producing the images of a histogram """
+    import numpy
+    import matplotlib.pyplot   as plt
+    import matplotlib.gridspec as gridspec
+
+    allsettings, arrays = Load()
+    settings = allsettings[name]
+    xData    = arrays[name+'_xData']
+    xBinning = arrays[name+'_xBinning']
+    weights  = arrays[name+'_weights']
+    if settings['stack']:
+        weights = numpy.cumsum(weights,axis=0)
+
+    # Creating a new Canvas
+    fig = plt.figure(figsize=tuple(settings['figsize']),dpi=settings['dpi'])
+    if settings['legend']:
+        frame = gridspec.GridSpec(1,1,right=0.7)
+    else:
+        frame = gridspec.GridSpec(1,1)
+    pad = fig.add_subplot(frame[0])
+
+    # Creating a new Stack (last dataset first)
+    for ind in range(len(weights)-1,-1,-1):
+        dataset = settings['datasets'][ind]
+        options = dict(x=xData, bins=xBinning, weights=weights[ind],
+                       label=dataset['title'], rwidth=1.,
+                       color=dataset['backcolor'], edgecolor=dataset['linecolor'],
+                       linewidth=dataset['linewidth'], linestyle=dataset['linestyle'],
+                       bottom=None, cumulative=False, align='mid',
+                       orientation='vertical')
+        if settings['filled']:
+            options['histtype'] = dataset['histtype']
+        try:
+            pad.hist(density=False, **options)
+        except (AttributeError, TypeError):
+            # matplotlib < 2.1
+            pad.hist(normed=False, **options)
+
+    # Axis
+    plt.rc('text',usetex=False)
+    plt.xlabel(settings['xlabel'],fontsize=16,color='black')
+    plt.ylabel(settings['ylabel'],fontsize=16,color='black')
+
+    # Boundary of y-axis
+    ymax = settings['ymax']
+    if ymax is None:
+        ymax = (weights[-1] if settings['stack'] else weights).max()*1.1
+    ymin = settings['ymin']
+    if settings['logy'] and (ymin is None or ymin<=0):
+        if settings['stack']:
+            candidates = weights[-1]
+        else:
+            candidates = numpy.append(weights.min(axis=1),1.)
+        ymin = candidates[candidates!=0].min()/100.
+    elif ymin is None:
+        ymin = 0
+    plt.gca().set_ylim(ymin,ymax)
+
+    # Log/Linear scales
+    if settings['logx']:
+        plt.gca().set_xscale('log',nonpositive='clip')
+    else:
+        plt.gca().set_xscale('linear')
+    if settings['logy']:
+        plt.gca().set_yscale('log',nonpositive='clip')
+    else:
+        plt.gca().set_yscale('linear')
+
+    # Labels for x-Axis
+    if settings['xlabels'] is not None:
+        plt.xticks(xData, settings['xlabels'], rotation='vertical')
+
+    # Legend
+    if settings['legend']:
+        plt.legend(bbox_to_anchor=(1.05,1), loc=2, borderaxespad=0.)
+
+    # Saving the image
+    for outputname in settings['outputs']:
+        plt.savefig(outputname)
@@ -25,10 +25,18 @@
 from __future__ import absolute_import
 import logging
 from math import sqrt
-from six.moves import range
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional: the bin contents are then stored in lists
+    numpy = None
 
 
-class HistogramCore:
+class HistogramCore(object):
+
+    __slots__ = ['nevents', 'nentries', 'integral', 'sumwentries', 'sumw',
+                 'sumw2', 'sumwx', 'sumw2x', 'underflow', 'overflow', 'nan',
+                 'inf', '_array']
 
     def __init__(self):
 
@@ -52,18 +60,65 @@ class HistogramCore:
         self.array       = []
 
 
+    # bin contents, always stored as a (private copy of a) float array,
+    # or as a list of floats without NumPy
+    @property
+    def array(self):
+        return self._array
+
+    @array.setter
+    def array(self, values):
+        if numpy is None:
+            self._array = [float(x) for x in values]
+        else:
+            self._array = numpy.array(values, dtype=float)
+
+
     def ComputeIntegral(self):
-        self.integral = 0
-        for i in range(0,len(self.array)):
-            self.integral+=self.array[i]
-        self.integral += self.overflow
-        self.integral += self.underflow
-        
+        self.integral = self.Sum() + self.overflow + self.underflow
+
+
+    def Sum(self):
+        if numpy is None:
+            return float(sum(self.array))
+        return float(self.array.sum())
+
+
+    def SetDifference(self, positive, negative):
+        """ Bin contents of positive minus those of negative, the negative
+            results being set to zero. Returns the indices and the values of
+            these bins. """
+        if numpy is None:
+            data   = [x-y for x, y in zip(positive.array, negative.array)]
+            bins   = [i for i, x in enumerate(data) if x < 0]
+            values = [data[i] for i in bins]
+            self._array = [max(x, 0.) for x in data]
+            return bins, values
+        data   = positive.array - negative.array
+        bins   = numpy.flatnonzero(data < 0)
+        values = data[bins]
+        data[bins] = 0.
+        self._array = data
+        return bins, values
+
+
+    @staticmethod
+    def NegativeBinsWarning(dataset, bins, values):
+        """ Single warning message for all the bins of a histogram whose
+            content has been set to zero """
+        shown = ', '.join(str(x) for x in bins[:10])
+        if len(bins) > 10:
+            shown += ', ...'
+        return 'dataset='+dataset.name+' -> '+str(len(bins))+\
+               ' bin(s) with a negative content (bins '+shown+\
+               '; smallest value: '+str(float(min(values)))+\
+               '). These values are set to zero'
+
 
     def Print(self):
 
         logging.getLogger('MA5').info('nevents='+str(self.nevents)+\
-                     ' entries='+str(self.entries))
+                     ' entries='+str(self.nentries))
 
         logging.getLogger('MA5').info('sumw='+str(self.sumw)+\
                      ' sumw2='+str(self.sumw2)+\
@@ -89,8 +144,3 @@ class HistogramCore:
         else:
             mean = self.GetMean()
             return sqrt(abs(self.sumw2x/self.sumw - mean*mean))
-        
- 
-        
-
-        
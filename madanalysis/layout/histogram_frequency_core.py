@@ -23,28 +23,22 @@
 
 
 from __future__ import absolute_import
+from madanalysis.layout.histogram_core import HistogramCore
 import logging
-class HistogramFrequencyCore:
+
+
+class HistogramFrequencyCore(HistogramCore):
+
+    __slots__ = ['entries']
 
     def __init__(self):
-        self.integral  = 0.
-        self.nevents   = 0
-        self.sumwentries = 0.
+        HistogramCore.__init__(self)
         self.entries   = 0.
-        self.nentries  = 0
-        self.overflow  = 0.
-        self.underflow = 0.
-        self.array     = []
 
     def ComputeIntegral(self):
-        self.integral = 0
-        for value in self.array:
-            self.integral+=value
+        self.integral = self.Sum()
 
     def Print(self):
 
         logging.getLogger('MA5').info('nevents='+str(self.nevents)+\
                      ' entries='+str(self.entries))
-        
-
-        
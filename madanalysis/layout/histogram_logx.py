@@ -99,17 +99,9 @@ class HistogramLogX:
             self.summary.overflow=0
             
         # Data
-        data = []
-        for i in range(0,len(self.positive.array)):
-            data.append(self.positive.array[i]-self.negative.array[i])
-            if data[-1]<0:
-                self.warnings.append(\
-                    'dataset='+dataset.name+\
-                    ' -> bin '+str(i)+\
-                    ' has a negative content : '+\
-                    str(data[-1])+'. This value is set to zero')
-                data[-1]=0
-        self.summary.array = data[:] # [:] -> clone of data
+        bins, values = self.summary.SetDifference(self.positive, self.negative)
+        if len(bins)!=0:
+            self.warnings.append(self.summary.NegativeBinsWarning(dataset, bins, values))
 
         # Integral
         self.positive.ComputeIntegral()
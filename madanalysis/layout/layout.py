@@ -43,8 +43,12 @@ from madanalysis.layout.plotflow                       import PlotFlow
 from madanalysis.layout.merging_plots                  import MergingPlots
 from madanalysis.selection.instance_name               import InstanceName
 from math                                              import log10, floor, ceil, isnan, isinf
+import filecmp
+import json
 import os
+import re
 import shutil
+import subprocess
 import logging
 from six.moves import range
 
@@ -180,18 +184,115 @@ class Layout:
         self.logger.debug('Producing scripts for foot plots ...')
         # to do
 
+        # Plots unchanged since the previous job
+        if self.main.graphic_render!=GraphicRenderType.NONE:
+            ListPlots = self.ReusePlots(histo_path,modes,output_paths,ListPlots)
+            if len(ListPlots)==0:
+                return True
+
         # Launching ROOT
         if self.main.graphic_render==GraphicRenderType.ROOT:
             producer=HistoRootProducer(histo_path,ListPlots)
             producer.Execute()
         elif self.main.graphic_render==GraphicRenderType.MATPLOTLIB:
-            producer=HistoMatplotlibProducer(histo_path,ListPlots)
+            producer=HistoMatplotlibProducer(histo_path,ListPlots,self.main.archi_info.ncores)
             producer.Execute()
 
         # Ok
         return True
 
 
+    @staticmethod
+    def PreviousJob(path):
+        # Folder of the previous job (MadAnalysis5job_<i-1>), if any
+        match = re.match(r'^(.*MadAnalysis5job_)([0-9]+)$',os.path.normpath(path))
+        if match is None or int(match.group(2))==0:
+            return None
+        previous = match.group(1)+str(int(match.group(2))-1)
+        if not os.path.isdir(previous):
+            return None
+        return previous
+
+
+    def ReusePlots(self,histo_path,modes,output_paths,plots):
+        # Saving the fingerprints of the current plots
+        try:
+            with open(histo_path+'/fingerprints.json','w') as output:
+                json.dump(self.plotflow.fingerprints,output,indent=1,sort_keys=True)
+        except Exception as err:
+            self.logger.debug('Cannot write the plot fingerprints: '+str(err))
+        if self.main.incremental_report!="on":
+            return plots
+
+        # Fingerprints of the previous job
+        previous       = Layout.PreviousJob(histo_path)
+        previous_paths = [Layout.PreviousJob(x) for x in output_paths]
+        if previous is None or None in previous_paths or \
+           not os.path.isfile(previous+'/fingerprints.json'):
+            return plots
+        try:
+            with open(previous+'/fingerprints.json') as inputfile:
+                fingerprints = json.load(inputfile)
+        except Exception as err:
+            self.logger.debug('Cannot read the plot fingerprints: '+str(err))
+            return plots
+
+        # Copying the images of the unchanged plots
+        remaining = []
+        for plot in plots:
+            name  = os.path.basename(plot)
+            files = []
+            for mode, output_path, previous_path in zip(modes,output_paths,previous_paths):
+                image = name+'.'+ReportFormatType.convert2filetype(mode)
+                files.append([previous_path+'/'+image, output_path+'/'+image])
+            if name not in self.plotflow.fingerprints or \
+               fingerprints.get(name)!=self.plotflow.fingerprints[name] or \
+               not all(os.path.isfile(source) for source, _ in files):
+                remaining.append(plot)
+                continue
+            for source, destination in files:
+                shutil.copy(source,destination)
+        if len(remaining)!=len(plots):
+            self.logger.info("     -> "+str(len(plots)-len(remaining))+\
+                             " unchanged plot(s) taken from the previous job")
+        return remaining
+
+
+    def ReuseReport(self,output_path,outputs):
+        # Is the report of the previous job the same (apart from its date)?
+        if self.main.incremental_report!="on":
+            return False
+        previous = Layout.PreviousJob(output_path)
+        if previous is None or \
+           not all(os.path.isfile(previous+'/'+x) for x in outputs):
+            return False
+        def ReadTex(path):
+            with open(path) as texfile:
+                return [line for line in texfile if not line.startswith('\\author{')]
+        try:
+            if ReadTex(output_path+'/main.tex')!=ReadTex(previous+'/main.tex'):
+                return False
+        except IOError:
+            return False
+
+        # Same figures, style files, ...
+        generated = lambda x: (x.startswith('main.') and x!='main.tex') or x.endswith('.log')
+        inputs = sorted(x for x in os.listdir(output_path) if not generated(x) and x!='main.tex')
+        if inputs!=sorted(x for x in os.listdir(previous) if not generated(x) and x!='main.tex'):
+            return False
+        for item in inputs:
+            if not os.path.isfile(output_path+'/'+item) or \
+               not filecmp.cmp(output_path+'/'+item,previous+'/'+item,shallow=False):
+                return False
+
+        # Copying the compiled report
+        for item in os.listdir(previous):
+            if generated(item):
+                shutil.copy(previous+'/'+item,output_path)
+        self.logger.info("     -> unchanged report taken from the previous job")
+        return True
+
+
     def CopyLogo(self,mode,output_path):
         
         # Filename
@@ -1288,14 +1389,42 @@ class Layout:
                 return False
         return True
 
+    @staticmethod
+    def RunLatex(program,output_path):
+        # Two passes (for the references), the output going to latex.log
+        ok = True
+        with open(output_path+'/latex.log','w') as log:
+            for npass in range(2):
+                try:
+                    code = subprocess.call([program,'-interaction=nonstopmode','main.tex'],\
+                                           stdout=log,stderr=subprocess.STDOUT,cwd=output_path)
+                except OSError as err:
+                    log.write('impossible to execute '+program+': '+str(err)+'\n')
+                    return False
+                ok = ok and code==0
+        return ok
+
+
+    def CompileReports(self,reports):
+        # Compiling several reports ([mode, output_path] pairs) at the same time
+        if len(reports)<=1:
+            return [self.CompileReport(mode,output_path) for mode, output_path in reports]
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(reports)) as executor:
+            return list(executor.map(lambda report: self.CompileReport(*report), reports))
+
+
     def CompileReport(self,mode,output_path):
         
         # ---- LATEX MODE ----
         if mode==ReportFormatType.LATEX:
 
+            # Report unchanged since the previous job
+            if self.ReuseReport(output_path,['main.dvi']):
+                return True
+
             # Launching latex and producing DVI file
-            os.system('cd '+output_path+'; latex -interaction=nonstopmode main.tex > latex.log 2>&1;'+\
-                      ' latex -interaction=nonstopmode main.tex >> latex.log 2>&1')
+            success = Layout.RunLatex('latex',output_path)
 
             name=os.path.normpath(output_path+'/main.dvi')
             if not os.path.isfile(name):
@@ -1303,8 +1432,8 @@ class Layout:
                 self.logger.error('Please have a look to the log file '+output_path+'/latex.log')
                 return False
             
-            # Checking latex log : are there errors
-            if not Layout.CheckLatexLog(output_path+'/latex.log'):
+            # Checking latex exit codes and log : are there errors
+            if not success or not Layout.CheckLatexLog(output_path+'/latex.log'):
                 self.logger.error('some errors occured during LATEX compilation')
                 self.logger.error('for more details, have a look to the log file : '+output_path+'/latex.log')
                 return False
@@ -1324,12 +1453,15 @@ class Layout:
         # ---- PDFLATEX MODE ----
         elif mode==ReportFormatType.PDFLATEX:
 
+            # Report unchanged since the previous job
+            if self.ReuseReport(output_path,['main.pdf']):
+                return True
+
             # Launching latex and producing PDF file
-            os.system('cd '+output_path+'; pdflatex -interaction=nonstopmode main.tex > latex.log 2>&1;'+\
-                      ' pdflatex -interaction=nonstopmode main.tex >> latex.log 2>&1');
+            success = Layout.RunLatex('pdflatex',output_path)
 
-            # Checking latex log : are there errors
-            if not Layout.CheckLatexLog(output_path+'/latex.log'):
+            # Checking latex exit codes and log : are there errors
+            if not success or not Layout.CheckLatexLog(output_path+'/latex.log'):
                 self.logger.error('some errors occured during LATEX compilation')
                 self.logger.error('for more details, have a look to the log file : '+output_path+'/latex.log')
                 return False
@@ -1338,5 +1470,7 @@ class Layout:
             name=os.path.normpath(output_path+'/main.pdf')
             if not os.path.isfile(name):
                 self.logger.error('PDF file cannot be produced')
-                self.logger.error('Please have a look to the log file '+output_path+'/latex2.log')
+                self.logger.error('Please have a look to the log file '+output_path+'/latex.log')
                 return False
+
+        return True
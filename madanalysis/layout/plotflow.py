@@ -30,11 +30,21 @@ from madanalysis.enumeration.color_type           import ColorType
 from madanalysis.enumeration.linestyle_type       import LineStyleType
 from madanalysis.enumeration.backstyle_type       import BackStyleType
 from madanalysis.enumeration.stacking_method_type import StackingMethodType
+from madanalysis.enumeration.graphic_render_type  import GraphicRenderType
 from madanalysis.layout.plotflow_for_dataset      import PlotFlowForDataset
 import madanalysis.enumeration.color_hex
+import hashlib
+import json
 import logging
+import shutil
 import six
 from six.moves import range
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional: the matplotlib data (and the plot fingerprints) are
+    # then not produced
+    numpy = None
 
 
 class PlotFlow:
@@ -46,6 +56,7 @@ class PlotFlow:
     def __init__(self,main):
         self.main               = main
         self.detail             = []
+        self.fingerprints       = {}
         for i in range(0,len(main.datasets)):
             self.detail.append(PlotFlowForDataset(main,main.datasets[i]))
 
@@ -136,6 +147,10 @@ class PlotFlow:
 
 
     def DrawAll(self,histo_path,modes,output_paths,ListROOTplots):
+        # Settings and arrays of the matplotlib histograms
+        settings = {}
+        arrays   = {}
+
         # Loop on each histo type
         irelhisto=0
         for iabshisto in range(0,len(self.main.selection)):
@@ -167,13 +182,25 @@ class PlotFlow:
             self.DrawROOT(histos,scales,self.main.selection[iabshisto],\
                           irelhisto,filenameC,output_files)
 
-            logging.getLogger('MA5').debug('Producing file '+filenamePy+' ...')
-            self.DrawMATPLOTLIB\
+            if numpy is not None:
+                logging.getLogger('MA5').debug('Producing file '+filenamePy+' ...')
+                self.DrawMATPLOTLIB\
                          (histos,scales,self.main.selection[iabshisto],\
-                          irelhisto,filenamePy,output_files)
+                          irelhisto,filenamePy,output_files,settings,arrays)
 
             irelhisto+=1
 
+        # Fingerprints of the histograms (data and style), identifying the
+        # plots which can be reused from a previous job
+        self.fingerprints = {}
+        for name in settings.keys():
+            self.fingerprints[name] = self.Fingerprint(name,settings,arrays)
+
+        # Data and renderer shared by all the matplotlib histograms
+        if self.main.graphic_render==GraphicRenderType.MATPLOTLIB:
+            if not self.WriteMATPLOTLIBData(histo_path,settings,arrays):
+                return False
+
 
         # Save ROOT files
         for ind in range(0,irelhisto):
@@ -182,6 +209,30 @@ class PlotFlow:
         return True
 
 
+    def Fingerprint(self,name,settings,arrays):
+        fingerprint = hashlib.sha1()
+        fingerprint.update((self.main.version+' '+str(self.main.graphic_render)).encode())
+        fingerprint.update(json.dumps(dict((key,value) for key,value in settings[name].items() \
+                                           if key!='outputs'), sort_keys=True).encode())
+        for item in ['_xBinning','_xData','_weights']:
+            fingerprint.update(str(arrays[name+item].shape).encode())
+            fingerprint.update(arrays[name+item].tobytes())
+        return fingerprint.hexdigest()
+
+
+    def WriteMATPLOTLIBData(self,histo_path,settings,arrays):
+        try:
+            with open(histo_path+'/histos.json','w') as output:
+                json.dump(settings,output,indent=1)
+            numpy.savez(histo_path+'/histos.npz',**arrays)
+            shutil.copy(self.main.archi_info.ma5dir+'/madanalysis/layout/histo_renderer.py',histo_path)
+        except Exception as err:
+            logging.getLogger('MA5').error('Impossible to write the histogram data in '+histo_path)
+            logging.getLogger('MA5').debug(str(err))
+            return False
+        return True
+
+
     def DrawROOT(self,histos,scales,ref,irelhisto,filenameC,outputnames):
 
         # Is there any legend?
@@ -537,7 +588,7 @@ class PlotFlow:
 
 
 
-    def DrawMATPLOTLIB(self,histos,scales,ref,irelhisto,filenamePy,outputnames):
+    def DrawMATPLOTLIB(self,histos,scales,ref,irelhisto,filenamePy,outputnames,settings,arrays):
 
         # Is there any legend?
         legendmode = False
@@ -563,116 +614,42 @@ class PlotFlow:
              self.main.stack==StackingMethodType.STACK ):
             stackmode=True
 
-
-        # Open the file in write-mode
-        try:
-            outputPy = open(filenamePy,'w')
-        except:
-            logging.getLogger('MA5').error('Impossible to write the file: '+filenamePy)
-            return False
-
-        # File header
+        # Name of the histogram (and of the function drawing it)
         function_name = filenamePy[:-3]
         function_name = function_name.split('/')[-1]
-        outputPy.write('def '+function_name+'():\n')
-        outputPy.write('\n')
-
-        # Import Libraries
-        outputPy.write('    # Library import\n')
-        outputPy.write('    import numpy\n')
-        outputPy.write('    import matplotlib\n')
-#        outputPy.write("    matplotlib.use('Agg')\n")
-        outputPy.write('    import matplotlib.pyplot   as plt\n')
-        outputPy.write('    import matplotlib.gridspec as gridspec\n')
-        outputPy.write('\n')
-
-        # Matplotlib & numpy version
-        outputPy.write('    # Library version\n')
-        outputPy.write('    matplotlib_version = matplotlib.__version__\n')
-        outputPy.write('    numpy_version      = numpy.__version__\n')
-        outputPy.write('\n')
 
         # Binning
-        # Loop over datasets and histos
         xnbin=histos[0].nbins
         xmin =histos[0].xmin
         xmax =histos[0].xmax
-        outputPy.write('    # Histo binning\n')
         if logxhisto:
-            outputPy.write('    xBinning = [')
-            for bin in range(1,xnbin+2):
-                if bin!=1:
-                    outputPy.write(',')
-                outputPy.write(str(histos[0].GetBinLowEdge(bin)))
-            outputPy.write(']\n')
-            outputPy.write('\n')
+            arrays[function_name+'_xBinning'] = numpy.array(\
+                [histos[0].GetBinLowEdge(bin) for bin in range(0,xnbin+1)])
         else:
-            outputPy.write('    xBinning = numpy.linspace('+\
-                           str(xmin)+','+str(xmax)+','+str(xnbin+1)+\
-                           ',endpoint=True)\n')
-        outputPy.write('\n')
-
-
-        # Data
-        outputPy.write('    # Creating data sequence: middle of each bin\n')
-        outputPy.write('    xData = numpy.array([')
-        for bin in range(0,xnbin):
-            if bin!=0:
-                outputPy.write(',')
-            outputPy.write(str(histos[0].GetBinMean(bin)))
-        outputPy.write('])\n\n')
-
-        # Loop over datasets and histos
-        ntot = 0
-        for ind in range(0,len(histos)):
-
-            # Creating a new histo
-            histoname='y'+histos[ind].name+'_'+str(ind)
-            outputPy.write('    # Creating weights for histo: '+histoname+'\n')
-            outputPy.write('    '+histoname+'_weights = numpy.array([')
-            for bin in range(1,xnbin+1):
-                ntot+=histos[ind].summary.array[bin-1]*scales[ind]
-                if bin!=1:
-                    outputPy.write(',')
-                outputPy.write(str(histos[ind].summary.array[bin-1]*scales[ind]))
-            outputPy.write('])\n\n')
+            arrays[function_name+'_xBinning'] = numpy.linspace(xmin,xmax,xnbin+1,endpoint=True)
 
+        # Data: middle of each bin
+        arrays[function_name+'_xData'] = numpy.array(\
+            [histos[0].GetBinMean(bin) for bin in range(0,xnbin)])
 
+        # Weights: one row for each dataset
+        weights = numpy.array([histos[ind].summary.array[:xnbin]*scales[ind] \
+                               for ind in range(0,len(histos))])
+        arrays[function_name+'_weights'] = weights
+        ntot = weights.sum()
 
         # Canvas
-        outputPy.write('    # Creating a new Canvas\n')
         dpi=80
         height=500
         widthx=700
         if legendmode:
             widthx=1000
-        outputPy.write('    fig   = plt.figure(figsize=('+\
-                       str(widthx/dpi)+','+str(height/dpi)+\
-                       '),dpi='+str(dpi)+')\n')
-        if not legendmode:
-            outputPy.write('    frame = gridspec.GridSpec(1,1)\n')
-        else:
-            outputPy.write('    frame = gridspec.GridSpec(1,1,right=0.7)\n')
-        # subplot argument: nrows, ncols, plot_number
-        # outputPy.write('    pad = fig.add_subplot(111)\n')
-        outputPy.write('    pad   = fig.add_subplot(frame[0])\n')
-        outputPy.write('\n')
 
-        # Stack
-        outputPy.write('    # Creating a new Stack\n')
+        # Style of each dataset (last dataset first, as in the stack)
+        datasets = []
         for ind in range(len(histos)-1,-1,-1):
-            myweight = 'y'+histos[ind].name+'_'+str(ind)+'_weights'
-            mytitle  = '"'+PlotFlow.NiceTitleMatplotlib(self.main.datasets[ind].title)+'"'
-            mytitle  = mytitle.replace('_','\_')
-
-            if not stackmode:
-                myweights='y'+histos[ind].name+'_'+str(ind)+'_weights'
-            else:
-                myweights=''
-                for ind2 in range(0,ind+1):
-                    if ind2>=1:
-                        myweights+='+'
-                    myweights+='y'+histos[ind2].name+'_'+str(ind2)+'_weights'
+            mytitle  = PlotFlow.NiceTitleMatplotlib(self.main.datasets[ind].title)
+            mytitle  = mytitle.replace('\\\\','\\').replace('_','\\_')
 
             # reset
             linecolor=0
@@ -778,51 +755,17 @@ class PlotFlow:
                 backstyle=BackStyleType.convert2matplotlib( \
                           self.main.datasets[ind].backstyle)
 
-            mylinecolor  = '"'+madanalysis.enumeration.color_hex.color_hex[linecolor]+'"'
-            mybackcolor  = '"'+madanalysis.enumeration.color_hex.color_hex[backcolor]+'"'
-
-            filledmode='"stepfilled"'
-            rWidth=1.
+            mybackcolor = madanalysis.enumeration.color_hex.color_hex[backcolor]
+            filledmode  = 'stepfilled'
             if backcolor==0: #invisible
-                filledmode='"step"'
-                mybackcolor = 'None'
-#            if frequencyhisto:
-#                filledmode='"bar"'
-#                rWidth=0.8
-            mylinewidth  = self.main.datasets[ind].linewidth
-            mylinestyle  = LineStyleType.convert2matplotlib(self.main.datasets[ind].linestyle)
-
-            outputPy.write('    pad.hist('+\
-                               'x=xData, '+\
-                               'bins=xBinning, '+\
-                               'weights='+myweights+',\\\n'+\
-                               '             label='+mytitle+', ')
-            if ntot!=0:
-                outputPy.write('histtype='+filledmode+', ')
-            try:
-                import matplotlib.pyplot as plt
-                plt.hist([0],normed=True)
-                outputPy.write(    'rwidth='+str(rWidth)+',\\\n'+\
-                                   '             color='+mybackcolor+', '+\
-                                   'edgecolor='+mylinecolor+', '+\
-                                   'linewidth='+str(mylinewidth)+', '+\
-                                   'linestyle='+mylinestyle+',\\\n'+\
-                                   '             bottom=None, '+\
-                                   'cumulative=False, normed=False, align="mid", orientation="vertical")\n\n')
-            except:
-                outputPy.write(    'rwidth='+str(rWidth)+',\\\n'+\
-                                   '             color='+mybackcolor+', '+\
-                                   'edgecolor='+mylinecolor+', '+\
-                                   'linewidth='+str(mylinewidth)+', '+\
-                                   'linestyle='+mylinestyle+',\\\n'+\
-                                   '             bottom=None, '+\
-                                   'cumulative=False, density=False, align="mid",'+\
-                                   ' orientation="vertical")\n\n')
-        outputPy.write('\n')
-
-        # Label
-        outputPy.write('    # Axis\n')
-        outputPy.write("    plt.rc('text',usetex=False)\n")
+                filledmode  = 'step'
+                mybackcolor = None
+            datasets.insert(0,{'title'     : mytitle,
+                               'linecolor' : madanalysis.enumeration.color_hex.color_hex[linecolor],
+                               'backcolor' : mybackcolor,
+                               'histtype'  : filledmode,
+                               'linewidth' : self.main.datasets[ind].linewidth,
+                               'linestyle' : LineStyleType.convert2matplotlib(self.main.datasets[ind].linestyle)[1:-1]})
 
         # X-axis
         if ref.titleX=="": 
@@ -831,8 +774,6 @@ class PlotFlow:
             axis_titleX = ref.titleX
         axis_titleX = axis_titleX.replace('#DeltaR','#Delta R')
         axis_titleX = axis_titleX.replace('#','\\')
-        outputPy.write('    plt.xlabel(r"'+axis_titleX+'",\\\n')
-        outputPy.write('               fontsize=16,color="black")\n')
 
         # Y-axis
         axis_titleY = ref.GetYaxis_Matplotlib()
@@ -855,159 +796,43 @@ class PlotFlow:
         if ref.titleY!="": 
             axis_titleY = PlotFlow.NiceTitle(ref.titleY)
         axis_titleY = axis_titleY.replace('#','\\')
-        outputPy.write('    plt.ylabel(r"'+axis_titleY+'",\\\n')
-        outputPy.write('               fontsize=16,color="black")\n')
-        outputPy.write('\n')
-
-        # Tag Log/Linear
-        is_logx=False
-        if ref.logX and ntot != 0:
-            is_logx=True
-        is_logy=False
-        if ref.logY and ntot != 0:
-            is_logy=True
-
-        # Bound y
-        outputPy.write('    # Boundary of y-axis\n')
-        myweights=''
-        if stackmode:
-            for ind in range(0,len(histos)):
-                if ind>=1:
-                    myweights+='+'
-                myweights+='y'+histos[ind].name+'_'+str(ind)+'_weights'
-        else:
-            myweights='numpy.array(['
-            for ind in range(0,len(histos)):
-                if ind>=1:
-                    myweights+=','
-                myweights+='y'+histos[ind].name+'_'+str(ind)+'_weights.max()'
-            myweights+='])'
-        if ref.ymax==[]:
-            outputPy.write('    ymax=('+myweights+').max()*1.1\n')
-        else:
-            outputPy.write('    ymax='+str(ref.ymax)+'\n')
-        outputPy.write('    ')
-        if ref.ymin==[]:
-            if is_logy:
-                outputPy.write('#')
-            outputPy.write('ymin=0 # linear scale\n')
-        else:
-            if is_logy and ref.ymin<=0:
-                outputPy.write('#')
-            outputPy.write('ymin=' + str(ref.ymin)+' # linear scale\n')
-
-        myweights=''
-        if stackmode:
-            for ind in range(0,len(histos)):
-                if ind>=1:
-                    myweights+='+'
-                myweights+='y'+histos[ind].name+'_'+str(ind)+'_weights'
-        else:
-            myweights='numpy.array(['
-            for ind in range(0,len(histos)):
-                if ind>=1:
-                    myweights+=','
-                myweights+='y'+histos[ind].name+'_'+str(ind)+'_weights.min()'
-            myweights+=',1.])'
-        outputPy.write('    ')
-        if ref.ymin==[]:
-            if not is_logy:
-                outputPy.write('#')
-            outputPy.write('ymin=min([x for x in ('+myweights+') if x])/100. # log scale\n')
-        else:
-            if is_logy and ref.ymin<=0:
-                outputPy.write('#')
-            outputPy.write('ymin=' + str(ref.ymin)+' # log scale\n')
-        outputPy.write('    plt.gca().set_ylim(ymin,ymax)\n')
-        outputPy.write('\n')
-
-        # X axis
-        outputPy.write('    # Log/Linear scale for X-axis\n')
-        # - Linear
-        outputPy.write('    ')
-        if is_logx:
-            outputPy.write('#')
-        outputPy.write('plt.gca().set_xscale("linear")\n')
-        # - Log
-        outputPy.write('    ')
-        if not is_logx:
-            outputPy.write('#')
-        outputPy.write('plt.gca().set_xscale("log",nonpositive="clip")\n')
-        outputPy.write('\n')
 
-
-        # Y axis
-        outputPy.write('    # Log/Linear scale for Y-axis\n')
-        # - Linear
-        outputPy.write('    ')
-        if is_logy:
-            outputPy.write('#')
-        outputPy.write('plt.gca().set_yscale("linear")\n')
-        # - Log
-        outputPy.write('    ')
-        if not is_logy:
-            outputPy.write('#')
-        outputPy.write('plt.gca().set_yscale("log",nonpositive="clip")\n')
-        outputPy.write('\n')
-
- 
-        # Labels
+        # Labels for x-Axis
+        xlabels = None
         if frequencyhisto:
-            outputPy.write('    # Labels for x-Axis\n')
-            outputPy.write('    xLabels = numpy.array([')
-            for bin in range(0,xnbin):
-                if bin>=1:
-                    outputPy.write(',')
-                outputPy.write('"'+str(histos[0].stringlabels[bin]).replace('_','\_')+'"')
-            outputPy.write('])\n')
-            outputPy.write('    plt.xticks(xData, xLabels, rotation="vertical")\n')
-            outputPy.write('\n')
-
-### BENJ: not necessary for getting the png and pdf files
-        # Draw
-#        outputPy.write('    # Draw\n')
-#        outputPy.write('    plt.show()\n')
-#        outputPy.write('\n')
-
-        # Legend
-        if legendmode:
-
-            # Reminder for 'loc'
-            # -'best'         : 0, (only implemented for axes legends)
-            # -'upper right'  : 1,
-            # -'upper left'   : 2,
-            # -'lower left'   : 3,
-            # -'lower right'  : 4,
-            # -'right'        : 5,
-            # -'center left'  : 6,
-            # -'center right' : 7,
-            # -'lower center' : 8,
-            # -'upper center' : 9,
-            # -'center'       : 10,
-
-            
-            outputPy.write('    # Legend\n')
-            outputPy.write('    plt.legend(bbox_to_anchor=(1.05,1), loc=2,'+\
-                                ' borderaxespad=0.)\n')
-            outputPy.write('\n')
-                           
-        # Producing the image
-        outputPy.write('    # Saving the image\n')
-        for outputname in outputnames:
-            outputPy.write("    plt.savefig('"+outputname+"')\n")
+            xlabels = [str(histos[0].stringlabels[bin]).replace('_','\\_') for bin in range(0,xnbin)]
+
+        # Settings of the figure
+        settings[function_name] = {
+            'figsize'  : [widthx/dpi, height/dpi],
+            'dpi'      : dpi,
+            'legend'   : legendmode,
+            'stack'    : stackmode,
+            'filled'   : bool(ntot!=0),
+            'datasets' : datasets,
+            'xlabel'   : axis_titleX,
+            'ylabel'   : axis_titleY,
+            'ymin'     : None if ref.ymin==[] else ref.ymin,
+            'ymax'     : None if ref.ymax==[] else ref.ymax,
+            'logx'     : bool(ref.logX and ntot != 0),
+            'logy'     : bool(ref.logY and ntot != 0),
+            'xlabels'  : xlabels,
+            'outputs'  : outputnames }
+
+        # Script drawing the histogram from these settings
+        try:
+            outputPy = open(filenamePy,'w')
+        except:
+            logging.getLogger('MA5').error('Impossible to write the file: '+filenamePy)
+            return False
+        outputPy.write('def '+function_name+'():\n')
+        outputPy.write('    import histo_renderer\n')
+        outputPy.write("    histo_renderer.Draw('"+function_name+"')\n")
         outputPy.write('\n')
-
-        # Call the function
         outputPy.write('# Running!\n')
         outputPy.write("if __name__ == '__main__':\n")
         outputPy.write('    '+function_name+'()\n')
-
-        # Close the file
-        try:
-            outputPy.close()
-        except:
-            logging.getLogger('MA5').error('Impossible to close the file: '+outputPy)
-            return False
+        outputPy.close()
 
         # Ok
         return True
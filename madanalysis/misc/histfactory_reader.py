@@ -24,9 +24,90 @@
 
 from __future__ import absolute_import
 import json, os, copy, math, logging
+from collections import OrderedDict
 from six.moves import range
 
 
+class WorkspaceCache(object):
+    """
+    Process-wide cache of the parsed background HistFactory files, indexed by the
+    location of the JSON file and its modification time. Each entry holds the
+    parsed JSON content together with the bin sizes, the number of samples and the
+    index of each channel. The least recently used entries are evicted once the
+    total size of the cached files exceeds `maxsize` bytes.
+    """
+    def __init__(self, maxsize=512*1024*1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.size    = 0
+
+    def get(self, path, name):
+        filename = os.path.join(path, name)
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            return None
+        key   = (os.path.abspath(path), name, mtime)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            # drop the outdated versions of the file
+            for old in [x for x in self.entries.keys() if x[:2] == key[:2]]:
+                self.size -= self.entries.pop(old)['size']
+            with open(filename, 'r') as json_file:
+                hf = json.load(json_file)
+            entry = {
+                'hf'        : hf,
+                'size'      : os.path.getsize(filename),
+                'bin_sizes' : [len(x.get('data', [])) for x in hf.get('observations', [])],
+                'nsamples'  : [len(x.get('samples', [])) for x in hf.get('channels', [])],
+                'channels'  : dict([(x['name'], i) for i, x in enumerate(hf.get('channels', []))]),
+                'workspace' : {},
+            }
+            self.size += entry['size']
+        self.entries[key] = entry
+        while self.size > self.maxsize and len(self.entries) > 1:
+            self.size -= self.entries.popitem(last=False)[1]['size']
+        return entry
+
+    def get_workspace(self, spec):
+        """
+        Returns the pyhf workspace of a background specification. The workspace
+        is compiled only once if the specification is one of the cached files.
+        """
+        import pyhf
+        for entry in self.entries.values():
+            for kind in ['hf', 'expected']:
+                if entry.get(kind) is spec:
+                    if kind not in entry['workspace']:
+                        entry['workspace'][kind] = pyhf.Workspace(spec)
+                    return entry['workspace'][kind]
+        return pyhf.Workspace(spec)
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.size    = 0
+
+
+workspace_cache = WorkspaceCache()
+
+
+def scale_modifier(modifier, scales):
+    """
+        Returns the modifier with its data rescaled by the factor associated to
+        its type. Modifiers without scale factor are returned as they are.
+    """
+    scale = scales.get(modifier['type'], None)
+    if scale is None:
+        return modifier
+    if modifier['type'] == 'histosys':
+        data = dict(modifier['data'],
+                    hi_data = [x*scale for x in modifier['data']['hi_data']],
+                    lo_data = [x*scale for x in modifier['data']['lo_data']])
+    else:
+        data = [x*scale for x in modifier['data']]
+    return dict(modifier, data = data)
+
+
 class HistFactory(object):
     def __init__(self,pyhf_config):
         self.pyhf_config = pyhf_config.get('SR'  , {})
@@ -48,12 +129,18 @@ class HistFactory(object):
             observables will be extrapolated and summed, summation is superseeded
             to the observed values since there is no observation in HL. 
             
-            Modifiers are extrapolated with respect to their nature."""
+            Modifiers are extrapolated with respect to their nature. Only the
+            extrapolated lists are copied, the rest of the specification being
+            shared with self.hf."""
         lumi = float(lumi)
         if lumi == self.lumi or self.hf in [{},[]]:
             return self.hf
-        HF = copy.deepcopy(self.hf)
         lumi_scale = round(lumi/self.lumi, 6)
+        # scale factor of the modifier data, per modifier type
+        # (normsys, normfactor, shapefactor and lumi are not extrapolated)
+        scales = {'shapesys'  : lumi_scale,
+                  'histosys'  : lumi_scale,
+                  'staterror' : math.sqrt(lumi_scale)}
 
         if isinstance(self, HF_Background):
             # Background extrapolation
@@ -62,75 +149,43 @@ class HistFactory(object):
                 if SR != 'lumi':
                     total_expected[SR] = [0.0]*len(item['data'])
 
-            for iSR in range(len(HF['channels'])):
-                self.logger.debug('  * Extrapolating channel '+ str(HF['channels'][iSR]['name']))
-                if len(total_expected[HF['channels'][iSR]['name']]) == 0:
+            HF = dict(self.hf)
+            HF['channels'] = []
+            for channel in self.hf['channels']:
+                self.logger.debug('  * Extrapolating channel '+ str(channel['name']))
+                expected = total_expected[channel['name']]
+                if len(expected) == 0:
+                    HF['channels'].append(channel)
                     continue
 
                 # modify the expected data of the sample
-                for sample in range(len(HF['channels'][iSR]['samples'])):
-                    self.logger.debug('    * Extrapolating '+str(HF['channels'][iSR]['samples'][sample]['name'])+ ' sample')
-                    for i in range(len(HF['channels'][iSR]['samples'][sample]['data'])):
-                        HF['channels'][iSR]['samples'][sample]['data'][i] *= lumi_scale
-                        total_expected[HF['channels'][iSR]['name']][i] += HF['channels'][iSR]['samples'][sample]['data'][i]
-
-                    for imod in range(len(HF['channels'][iSR]['samples'][sample]['modifiers'])):
-                        mod_type = HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['type']
-                        if mod_type in ['normsys', 'normfactor', 'shapefactor', 'lumi']:
-                            continue
-
-                        # extrapolate shape variables
-                        elif mod_type == 'shapesys':
-                            for i in range(len(HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data'])):
-                                HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data'][i] *= lumi_scale
-
-                        # extrapolate histo variables
-                        elif mod_type == 'histosys':
-                            for i in range(len(HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data']['hi_data'])):
-                                HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data']['hi_data'][i] *= lumi_scale
-                            for i in range(len(HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data']['lo_data'])):
-                                HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data']['lo_data'][i] *= lumi_scale
-
-                        # extrapolate stat variables
-                        elif mod_type == 'staterror':
-                            for i in range(len(HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data'])):
-                                HF['channels'][iSR]['samples'][sample]['modifiers'][imod]['data'][i] *= math.sqrt(lumi_scale)
+                samples = []
+                for sample in channel['samples']:
+                    self.logger.debug('    * Extrapolating '+str(sample['name'])+ ' sample')
+                    data = [x*lumi_scale for x in sample['data']]
+                    for i, x in enumerate(data):
+                        expected[i] += x
+                    samples.append(dict(sample, data = data,
+                        modifiers = [scale_modifier(x, scales) for x in sample['modifiers']]))
+                HF['channels'].append(dict(channel, samples = samples))
 
             # replace the observed bkg with total expected bkg
-            for key, item in total_expected.items():
-                for iobs in range(len(HF['observations'])):
-                    if key == HF['observations'][iobs]['name']:
-                        if item != []:
-                            HF['observations'][iobs]['data'] = item
+            HF['observations'] = [
+                dict(obs, data = total_expected[obs['name']])
+                if total_expected.get(obs['name'], []) != [] else obs
+                for obs in self.hf['observations']
+            ]
 
         elif isinstance(self, HF_Signal):#type(self) == HF_Signal:
             # Signal extrapolation
-            for i in range(len(HF)):
-                if HF[i]['op'] == 'remove':
+            HF = []
+            for patch in self.hf:
+                if patch['op'] == 'remove':
+                    HF.append(patch)
                     continue
-                HF[i]['value']['data'] = [round(x*lumi_scale,6) for x in HF[i]['value']['data']]
-                # Extrapolate modifiers
-                for imod in range(len(HF[i]['value']['modifiers'])):
-                    mod_type = HF[i]['value']['modifiers'][imod]['type']
-                    if mod_type in ['normsys', 'normfactor', 'shapefactor', 'lumi']:
-                        continue
-
-                    # extrapolate shape variables
-                    elif mod_type == 'shapesys':
-                        for i in range(len(HF[i]['value']['modifiers'][imod]['data'])):
-                            HF[i]['value']['modifiers'][imod]['data'][i] *= lumi_scale
-
-                    # extrapolate histo variables
-                    elif mod_type == 'histosys':
-                        for i in range(len(HF[i]['value']['modifiers'][imod]['data']['hi_data'])):
-                            HF[i]['value']['modifiers'][imod]['data']['hi_data'][i] *= lumi_scale
-                        for i in range(len(HF[i]['value']['modifiers'][imod]['data']['lo_data'])):
-                            HF[i]['value']['modifiers'][imod]['data']['lo_data'][i] *= lumi_scale
-
-                    # extrapolate statistical variables
-                    elif mod_type == 'staterror':
-                        for i in range(len(HF[i]['value']['modifiers'][imod]['data'])):
-                            HF[i]['value']['modifiers'][imod]['data'][i] *= math.sqrt(lumi_scale)
+                HF.append(dict(patch, value = dict(patch['value'],
+                    data      = [round(x*lumi_scale,6) for x in patch['value']['data']],
+                    modifiers = [scale_modifier(x, scales) for x in patch['value']['modifiers']])))
 
         return HF
 
@@ -139,14 +194,17 @@ class HF_Background(HistFactory):
     def __init__(self, pyhf_config, expected=False):
         super(HF_Background, self).__init__(pyhf_config)
         self.logger.debug('Reading : '+os.path.join(self.path,self.name))
-        if os.path.isfile(os.path.join(self.path,self.name)):
-            with open(os.path.join(self.path,self.name),'r') as json_file:
-                self.hf = json.load(json_file)
+        # The parsed file is shared between all instances and must not be modified
+        entry = workspace_cache.get(self.path, self.name)
+        if entry is not None:
+            self.hf = entry['hf']
         else:
             self.logger.warning('Can not find file : '+ os.path.join(self.path,self.name))
 
-        if expected:
-            self.hf = self.impose_expected()
+        if expected and entry is not None:
+            if 'expected' not in entry:
+                entry['expected'] = self.impose_expected()
+            self.hf = entry['expected']
 
     def size(self):
         # The number of SRs in the likelihood profile
@@ -213,10 +271,10 @@ class HF_Signal(HistFactory):
         super(HF_Signal, self).__init__(pyhf_config)
         self.signal_config = {}
 
-        with open(os.path.join(self.path, self.name), 'r') as json_file:
-            tmp_bkg = json.load(json_file)
-
-        bin_sizes = [len(x.get('data', [])) for x in tmp_bkg.get('observations',[])]
+        background = workspace_cache.get(self.path, self.name)
+        if background is None:
+            raise IOError('Can not find file : '+os.path.join(self.path, self.name))
+        bin_sizes = background['bin_sizes']
 
         for key, item in self.pyhf_config.items():
             if key != 'lumi':
@@ -228,7 +286,7 @@ class HF_Signal(HistFactory):
                     self.signal_config[key]['op'] = 'add'
                     self.signal_config[key]["path"] = \
                         '/channels/' + str(item['channels']) + '/samples/' + \
-                        str(len(tmp_bkg["channels"][int(item['channels'])]["samples"])-1)
+                        str(background['nsamples'][int(item['channels'])]-1)
                     self.signal_config[key]["bin_size"] = \
                         bin_sizes[int(self.signal_config[key]["path"].split('/')[2])]
 
@@ -374,14 +432,11 @@ def get_HFID(file,SRname):
     """
         Extract the location of the profiles within the JSON file.
     """
-    if os.path.isfile(file):
-        with open(file, 'r') as json_file:
-            HF = json.load(json_file)
-    else:
+    background = workspace_cache.get(*os.path.split(file))
+    if background is None:
         return 'Can not find background file: '+file
-    for ch in HF['channels']:
-        if ch['name'] == SRname:
-            return HF['channels'].index(ch)
+    if SRname in background['channels']:
+        return background['channels'][SRname]
     return 'Invalid or corrupted info file.'
 
 
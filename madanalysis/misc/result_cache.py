@@ -0,0 +1,106 @@
+################################################################################
+#
+#  Copyright (C) 2012-2023 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+from __future__ import absolute_import
+import hashlib, json, logging, os, pickle
+
+
+class ResultCache(object):
+    """
+    Persistent store (SQLite database) of the results of the recasting limit
+    calculations. Results are indexed by a digest of all the inputs they depend on,
+    so that unchanged signal regions are not recomputed when a job is rerun.
+
+    :param filename: path to the SQLite database
+    """
+
+    # to be increased whenever the stored results change meaning
+    version = 2
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.logger   = logging.getLogger('MA5')
+        self.digests  = {}
+        self.db       = None
+        try:
+            import sqlite3
+            self.db = sqlite3.connect(filename)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)")
+            self.db.commit()
+        except Exception as err:
+            self.logger.debug('Cannot open the result cache '+filename+': '+str(err))
+            self.db = None
+
+    def isAlive(self):
+        return self.db is not None
+
+    def key(self, *args):
+        """Digest of a set of JSON-serialisable inputs."""
+        content = json.dumps([ResultCache.version]+list(args), sort_keys=True, default=str)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def file_digest(self, filename):
+        """Digest of the content of a file (memoised on the modification time and size)."""
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        tag = (filename, stat.st_mtime, stat.st_size)
+        if tag not in self.digests:
+            sha1 = hashlib.sha1()
+            with open(filename, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha1.update(block)
+            self.digests[tag] = sha1.hexdigest()
+        return self.digests[tag]
+
+    def get(self, key):
+        """Returns the stored result, or None if there is none."""
+        if self.db is None:
+            return None
+        try:
+            row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            return None if row is None else pickle.loads(row[0])
+        except Exception as err:
+            self.logger.debug('Cannot read from the result cache: '+str(err))
+            return None
+
+    def set(self, key, value):
+        if self.db is None:
+            return
+        try:
+            import sqlite3
+            self.db.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                            (key, sqlite3.Binary(pickle.dumps(value, protocol=2))))
+        except Exception as err:
+            self.logger.debug('Cannot write to the result cache: '+str(err))
+
+    def close(self):
+        if self.db is not None:
+            try:
+                self.db.commit()
+            except Exception as err:
+                self.logger.debug('Cannot write to the result cache: '+str(err))
+            self.db.close()
+            self.db = None
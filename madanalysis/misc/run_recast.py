@@ -29,12 +29,17 @@ from madanalysis.configuration.delphes_configuration            import DelphesCo
 from madanalysis.IOinterface.folder_writer                      import FolderWriter
 from madanalysis.IOinterface.job_writer                         import JobWriter
 from madanalysis.IOinterface.library_writer                     import LibraryWriter
-from madanalysis.misc.histfactory_reader                        import HF_Background, HF_Signal, get_HFID
+from madanalysis.IOinterface.saf_reader                         import ReadCutflows
+from madanalysis.misc.histfactory_reader                        import HF_Background, HF_Signal, get_HFID, workspace_cache
+from madanalysis.misc.result_cache                              import ResultCache
 from collections                                                import OrderedDict
 from shell_command                                              import ShellCommand
 from string_tools                                               import StringTools
 from six.moves                                                  import map, range, input
-import copy, logging, math, os, shutil, time, sys, json
+import copy, glob, hashlib, logging, math, multiprocessing, os, shutil, time, sys, json
+
+# RunRecast instance used by the worker processes of the CLs calculation
+_cls_runner = None
 
 
 class RunRecast():
@@ -55,7 +60,10 @@ class RunRecast():
         self.logger           = logging.getLogger('MA5')
         self.is_apriori       = True
         self.cls_calculator   = cls
+        self.toy_cache        = ToyCache(seed=self.main.recasting.CLs_seed)
+        self.ncores           = None
         self.TACO_output      = self.main.recasting.TACO_output
+        self.timings          = OrderedDict()
 
     def init(self):
         ### First, the analyses to take care off
@@ -74,7 +82,9 @@ class RunRecast():
 
 
     def SetCLsCalculator(self):
-        if self.main.session_info.has_pyhf and self.main.recasting.CLs_calculator_backend == "pyhf":
+        if self.main.recasting.CLs_calculator_backend == "asymptotic":
+            self.cls_calculator = asymptotic_cls
+        elif self.main.session_info.has_pyhf and self.main.recasting.CLs_calculator_backend == "pyhf":
             self.cls_calculator = pyhf_wrapper
         elif not self.main.session_info.has_pyhf:
             self.main.recasting.CLs_calculator_backend = "native"
@@ -86,10 +96,21 @@ class RunRecast():
         elif not self.main.session_info.has_pyhf and self.main.recasting.expectation_assumption == "aposteriori":
             self.main.recasting.expectation_assumption = "apriori"
             self.main.recasting.CLs_calculator_backend = "native"
+            self.cls_calculator = cls
             self.is_apriori = True
             self.logger.warning("A posteriori expectation calculation is not available, " + \
                                 "a priori limits will be calculated.")
 
+    def region_cls(self, region, nobs, nb, deltanb, nsignal, **kwargs):
+        """
+        Computes 1-CLs for a given signal region with the selected calculator. The
+        native calculator relies on the background toys cached for the region, so
+        that all signal hypotheses tested for a region share the same random numbers.
+        """
+        if self.cls_calculator is cls:
+            return self.toy_cache.cls(region, nobs, nb, deltanb, nsignal, self.ntoys)
+        return self.cls_calculator(nobs, nb, deltanb, nsignal, self.ntoys, **kwargs)
+
     ################################################
     ### GENERAL METHODS
     ################################################
@@ -106,7 +127,7 @@ class RunRecast():
                 return False
 
             ## Running the fastsim
-            if not self.fastsim_single(version, card):
+            if not self.timed('detector simulation', self.fastsim_single, version, card):
                 self.main.forced=self.forced
                 return False
             self.main.fastsim.package = self.detector
@@ -121,9 +142,26 @@ class RunRecast():
                 return False
 
         # exit
+        self.timing_report()
         self.main.forced=self.forced
         return True
 
+    def timed(self, stage, function, *args):
+        ## Calling a function and adding its wall time to the given recasting stage
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.) + time.time() - start
+
+    def timing_report(self):
+        if len(self.timings)==0:
+            return
+        self.logger.info("   Time spent in the recasting stages:")
+        width = max([len(stage) for stage in self.timings.keys()])
+        for stage, elapsed in self.timings.items():
+            self.logger.info("     - "+stage.ljust(width)+" : "+('%.1f' % elapsed).rjust(8)+" s")
+
 
     ## Prompt to edit the recasting card
     def edit_recasting_card(self):
@@ -545,44 +583,61 @@ class RunRecast():
                 analyses = [ x for x in analyses if x in ana_list]
                 break
 
-        # Executing the PAD
-        for myset in self.main.datasets:
-            if version in ['v1.1', 'v1.2']:
-                ## Preparing the PAD
-                self.update_pad_main(analyses)
-                if not self.make_pad():
-                    self.main.forced=self.forced
-                    return False
-                ## Getting the file name corresponding to the events
+        ## Preparing the PAD (the same executable is used for all datasets)
+        if version in ['v1.1', 'v1.2'] and not self.build_pad(analyses):
+            self.main.forced=self.forced
+            return False
+
+        ## Getting the file names corresponding to the events
+        eventfiles = OrderedDict()
+        if version in ['v1.1', 'v1.2']:
+            for myset in self.main.datasets:
                 eventfile = os.path.normpath(self.dirname + '/Output/SAF/' + myset.name + '/RecoEvents/RecoEvents_' +\
                        version.replace('.','x')+'_' + card.replace('.tcl','')+'.root')
                 if not os.path.isfile(eventfile):
                     self.logger.error('The file called '+eventfile+' is not found...')
                     return False
+                eventfiles[myset.name] = eventfile
+
+        ## Running the PAD on several datasets at once (one sandbox per dataset)
+        sandboxes = {}
+        if self.get_pad_jobs(len(eventfiles)) > 1:
+            sandboxes = self.timed('PAD runs', self.run_pad_sandboxes, eventfiles)
+            if sandboxes is None:
+                self.main.forced=self.forced
+                return False
+
+        # Executing the PAD
+        for myset in self.main.datasets:
+            if version in ['v1.1', 'v1.2']:
+                eventfile = eventfiles[myset.name]
+                sandbox   = sandboxes.get(myset.name, None)
                 ## Running the PAD
-                if not self.run_pad(eventfile):
+                if sandbox is None and not self.timed('PAD runs', self.run_pad, eventfile):
                     self.main.forced=self.forced
                     return False
                 ## Saving the output and cleaning
-                if not self.save_output('\"'+eventfile+'\"', myset.name, analyses, card):
+                if not self.timed('output merging', self.save_output, '\"'+eventfile+'\"', myset.name,
+                                  analyses, card, sandbox):
+                    self.main.forced=self.forced
+                    return False
+                if sandbox is not None and not FolderWriter.RemoveDirectory(sandbox):
                     self.main.forced=self.forced
                     return False
                 if not self.main.recasting.store_root:
                     os.remove(eventfile)
-                else:
-                    time.sleep(1.);
             else:
                 # Run SFS
-                if not self.run_SimplifiedFastSim(myset,self.main.archi_info.ma5dir+\
-                                                  '/tools/PADForSFS/Input/Cards/'+\
-                                                  card,analyses):
+                if not self.timed('SFS runs', self.run_SimplifiedFastSim, myset,
+                                  self.main.archi_info.ma5dir+'/tools/PADForSFS/Input/Cards/'+card,
+                                  analyses):
                     return False
                 if self.main.recasting.store_root:
                     self.logger.warning("Simplified-FastSim does not use root, hence file will not be stored.")
 
             ## Running the CLs exclusion script (if available)
             self.logger.debug('Compute CLs exclusion for '+myset.name)
-            if self.ntoys>0 and not self.compute_cls(analyses,myset):
+            if self.ntoys>0 and not self.timed('CLs calculation', self.compute_cls, analyses, myset):
                 self.main.forced=self.forced
                 return False
 
@@ -665,14 +720,54 @@ class RunRecast():
         ## exit
         mainfile.close()
         newfile.close()
-        time.sleep(1.);
+        return True
+
+    def pad_build_key(self):
+        ## Hash of the sources (and Makefile) of the PAD executable and of the libraries it uses
+        build = os.path.normpath(self.dirname+'_RecastRun/Build')
+        key   = hashlib.sha1(self.pad.encode())
+        for pattern in ['Makefile', 'Main/*.cpp', 'Main/*.h', 'SampleAnalyzer/User/*/*.cpp', 'SampleAnalyzer/User/*/*.h']:
+            for filename in sorted(glob.glob(os.path.join(build,pattern))):
+                key.update(os.path.relpath(filename,build).encode())
+                with open(filename,'rb') as source:
+                    key.update(source.read())
+        ## Architecture and SampleAnalyzer libraries the executable is linked against
+        ma5dir = self.main.archi_info.ma5dir
+        architecture = os.path.normpath(ma5dir+'/tools/architecture.ma5')
+        if os.path.isfile(architecture):
+            with open(architecture,'rb') as source:
+                key.update(source.read())
+        for filename in sorted(glob.glob(os.path.normpath(ma5dir+'/tools/SampleAnalyzer/Lib')+'/lib*_for_ma5.*')):
+            info = os.stat(filename)
+            key.update((os.path.basename(filename)+' '+str(info.st_mtime)+' '+str(info.st_size)).encode())
+        return key.hexdigest()
+
+    def build_pad(self, analyses):
+        ## Writing the PAD sources
+        if not self.timed('PAD sources', self.update_pad_main, analyses):
+            return False
+        ## Executable already compiled from the same sources in this job directory
+        executable = os.path.normpath(self.dirname+'_RecastRun/Build/MadAnalysis5job')
+        cache      = os.path.normpath(self.dirname+'/Build/PADCache/'+self.pad_build_key())
+        if os.path.isfile(cache+'/MadAnalysis5job'):
+            self.logger.info('   Using the PAD executable compiled for the same analyses ('+cache+')')
+            shutil.copy2(cache+'/MadAnalysis5job', executable)
+            return True
+        ## Compilation and caching of the executable
+        if not self.timed('PAD compilation', self.make_pad):
+            return False
+        try:
+            if not os.path.isdir(cache):
+                os.makedirs(cache)
+            shutil.copy2(executable, cache+'/MadAnalysis5job')
+        except (IOError, OSError) as err:
+            self.logger.debug('Cannot store the PAD executable in '+cache+': '+str(err))
         return True
 
     def make_pad(self):
         # Initializing the compiler
         self.logger.info('   Compiling the PAD located in '  +self.dirname+'_RecastRun');
-        compiler = LibraryWriter('lib',self.main)
-        ncores = compiler.get_ncores2()
+        ncores = self.get_ncores()
         # compiling
         command = ['make']
         strcores='' #ERIC
@@ -681,41 +776,88 @@ class RunRecast():
             command.append(strcores)
         logfile = self.dirname+'_RecastRun/Build/Log/PADcompilation.log'
         result, out = ShellCommand.ExecuteWithLog(command,logfile,self.dirname+'_RecastRun/Build')
-        time.sleep(1.);
-        # Checks and exit
-        if not result:
+        # Checks and exit (make has returned, the executable is complete)
+        if not result or not os.path.isfile(self.dirname+'_RecastRun/Build/MadAnalysis5job'):
             self.logger.error('Impossible to compile the PAD. For more details, see the log file:')
             self.logger.error(logfile)
             return False
         return True
 
-    def run_pad(self,eventfile):
+    def run_pad(self, eventfile, sandbox=None):
+        ## working directory (the sandboxes share the executable of the Build directory)
+        rundir = self.dirname+'_RecastRun' if sandbox is None else sandbox
         ## input file
-        if os.path.isfile(self.dirname+'_RecastRun/Input/PADevents.list'):
-            os.remove(self.dirname+'_RecastRun/Input/PADevents.list')
-        infile = open(self.dirname+'_RecastRun/Input/PADevents.list','w')
-        infile.write(eventfile)
-        infile.close()
+        if os.path.isfile(rundir+'/Input/PADevents.list'):
+            os.remove(rundir+'/Input/PADevents.list')
+        with open(rundir+'/Input/PADevents.list','w') as infile:
+            infile.write(eventfile)
         ## cleaning the output directory
-        if os.path.isdir(os.path.normpath(self.dirname+'_RecastRun/Output/SAF/PADevents')):
-            if not FolderWriter.RemoveDirectory(os.path.normpath(self.dirname+'_RecastRun/Output/SAF/PADevents')):
+        if os.path.isdir(os.path.normpath(rundir+'/Output/SAF/PADevents')):
+            if not FolderWriter.RemoveDirectory(os.path.normpath(rundir+'/Output/SAF/PADevents')):
                 return False
         ## running
         command = ['./MadAnalysis5job', '../Input/PADevents.list']
-        ok = ShellCommand.Execute(command,self.dirname+'_RecastRun/Build')
-        ## checks
-        if not ok:
+        if sandbox is None:
+            ok = ShellCommand.Execute(command,rundir+'/Build')
+        else:
+            logfile = rundir+'/Build/PADrun.log'
+            ok, out = ShellCommand.ExecuteWithLog(command,logfile,rundir+'/Build',silent=True)
+        ## checks (the PAD has returned, its output files are closed)
+        if not ok or not os.path.isfile(rundir+'/Output/SAF/PADevents/PADevents.saf'):
             self.logger.error('Problem with the run of the PAD on the file: '+ eventfile)
+            if sandbox is not None:
+                self.logger.error('For more details, see the log file: '+logfile)
             return False
-        os.remove(self.dirname+'_RecastRun/Input/PADevents.list')
+        os.remove(rundir+'/Input/PADevents.list')
         ## exit
-        time.sleep(1.);
         return True
 
-    def save_output(self, eventfile, setname, analyses, card):
+    def get_pad_jobs(self, ndatasets):
+        ## Number of datasets analysed simultaneously by the PAD
+        njobs = self.main.recasting.PAD_jobs
+        if njobs is None:
+            njobs = self.get_ncores()
+        return max(1, min(njobs, ndatasets))
+
+    def make_sandbox(self, setname):
+        ## Input and output directories of a dataset, the executable being linked to the Build one
+        sandbox = os.path.normpath(self.dirname+'_RecastRun/Sandbox/'+setname)
+        if not FolderWriter.RemoveDirectory(sandbox):
+            return None
+        for subdir in ['Build', 'Input', 'Output/SAF']:
+            os.makedirs(os.path.join(sandbox,subdir))
+        executable = os.path.abspath(self.dirname+'_RecastRun/Build/MadAnalysis5job')
+        try:
+            os.symlink(executable, sandbox+'/Build/MadAnalysis5job')
+        except (AttributeError, NotImplementedError, OSError):
+            shutil.copy2(executable, sandbox+'/Build/MadAnalysis5job')
+        return sandbox
+
+    def run_pad_sandboxes(self, eventfiles):
+        from concurrent.futures import ThreadPoolExecutor
+        njobs = self.get_pad_jobs(len(eventfiles))
+        self.logger.info('   Running the PAD on '+str(len(eventfiles))+' datasets ('+\
+                         str(njobs)+' simultaneous jobs)')
+        ## Preparing the sandboxes
+        sandboxes = OrderedDict()
+        for setname in eventfiles.keys():
+            sandbox = self.make_sandbox(setname)
+            if sandbox is None:
+                self.logger.error('Impossible to prepare the PAD run directory of the dataset '+setname)
+                return None
+            sandboxes[setname] = sandbox
+        ## Running (the PAD runs are subprocesses, a thread waiting for each of them)
+        with ThreadPoolExecutor(max_workers=njobs) as executor:
+            results = list(executor.map(lambda x: self.run_pad(eventfiles[x], sandboxes[x]), sandboxes.keys()))
+        if not all(results):
+            return None
+        return sandboxes
+
+    def save_output(self, eventfile, setname, analyses, card, sandbox=None):
+        rundir  = self.dirname+'_RecastRun' if sandbox is None else sandbox
         outfile = self.dirname+'/Output/SAF/'+setname+'/'+setname+'.saf'
         if not os.path.isfile(outfile):
-            shutil.move(self.dirname+'_RecastRun/Output/SAF/PADevents/PADevents.saf',outfile)
+            shutil.move(rundir+'/Output/SAF/PADevents/PADevents.saf',outfile)
         else:
             inp = open(outfile, 'r')
             out = open(outfile+'.2', 'w')
@@ -738,13 +880,15 @@ class RunRecast():
                 else:
                     out.write(line)
             inp.close()
+            out.flush()
+            os.fsync(out.fileno())
             out.close()
-            shutil.move(outfile+'.2', outfile)
+            os.replace(outfile+'.2', outfile)
         for analysis in analyses:
-            shutil.move(self.dirname+'_RecastRun/Output/SAF/PADevents/'+analysis+'_0',self.dirname+'/Output/SAF/'+setname+'/'+analysis)
+            shutil.move(rundir+'/Output/SAF/PADevents/'+analysis+'_0',self.dirname+'/Output/SAF/'+setname+'/'+analysis)
         if self.TACO_output!='':
             filename  = '.'.join(self.TACO_output.split('.')[:-1]) + '_' + card.replace('tcl','') + self.TACO_output.split('.')[-1]
-            shutil.move(self.dirname+'_RecastRun/Output/'+self.TACO_output,self.dirname+'/Output/SAF/'+setname+'/'+filename)
+            shutil.move(rundir+'/Output/'+self.TACO_output,self.dirname+'/Output/SAF/'+setname+'/'+filename)
         return True
 
     ################################################
@@ -766,22 +910,11 @@ class RunRecast():
             self.logger.info("\033[1m     Please cite arXiv:1910.11418 [hep-ph]\033[0m")
 
 
-        ## Running over all luminosities to extrapolate
+        ## Running over all luminosities to extrapolate and all analyses to collect the inputs
+        jobs = []
         for extrapolated_lumi in ['default']+self.main.recasting.extrapolated_luminosities:
             self.logger.info('   Calculation of the exclusion CLs for a lumi of ' +
                              str(extrapolated_lumi))
-            ## Preparing the output file and checking whether a cross section has been defined
-            outext  = "" if extrapolated_lumi == 'default' else "_lumi_{:.3f}".format(extrapolated_lumi)
-            outfile = os.path.join(self.dirname, 'Output/SAF',
-                                   dataset.name, 'CLs_output'+outext+'.dat')
-            if os.path.isfile(outfile):
-                mysummary=open(outfile,'a+')
-                mysummary.write("\n")
-            else:
-                mysummary=open(outfile,'w')
-                self.write_cls_header(dataset.xsection, mysummary)
-
-            ## running over all analysis
             for analysis in analyses:
                 self.logger.debug('Running CLs exclusion calculation for '+analysis)
                 # Getting the info file information (possibly rescaled)
@@ -817,7 +950,7 @@ class RunRecast():
                     self.logger.info("\033[1m     Please cite arXiv:2206.14870 [hep-ph]\033[0m")
 
 
-            ## Reading the cutflow information
+                ## Reading the cutflow information
                 regiondata=self.read_cutflows(
                     self.dirname+'/Output/SAF/'+dataset.name+'/'+analysis+'/Cutflows',
                     regions, regiondata
@@ -826,67 +959,108 @@ class RunRecast():
                     self.logger.warning('Info file for '+analysis+' corrupted. Skipping the CLs calculation.')
                     return False
 
-                ## Performing the CLS calculation
-                regiondata=self.extract_sig_cls(regiondata,regions,lumi,"exp")
-                if self.cov_config != {}:
-                    regiondata=self.extract_sig_lhcls(regiondata,lumi,"exp")
-                # CLs calculation for pyhf
-                regiondata = self.pyhf_sig95Wrapper(lumi, regiondata, "exp")
-
-                if extrapolated_lumi=='default':
-                    if self.cov_config != {}:
-                        regiondata=self.extract_sig_lhcls(regiondata,lumi,"obs")
-                    regiondata = self.extract_sig_cls(regiondata,regions,lumi,"obs")
-                    regiondata = self.pyhf_sig95Wrapper(lumi,regiondata,'obs')
-                else:
-                    for reg in regions:
-                        regiondata[reg]["nobs"]=regiondata[reg]["nb"]
-                xsflag=True
-                if dataset.xsection > 0:
-                    xsflag=False
-                    regiondata=self.extract_cls(regiondata,regions,dataset.xsection,lumi)
-
-                ## Uncertainties on the rates
-                Error_dict = {}
-                if dataset.scaleup != None:
-                    Error_dict['scale_up'] =  round(dataset.scaleup,8)
-                    Error_dict['scale_dn'] = -round(dataset.scaledn,8)
-                else:
-                    Error_dict['scale_up'], Error_dict['scale_dn'] = 0., 0.
-                if dataset.pdfup != None:
-                    Error_dict['pdf_up'] =  round(dataset.pdfup,8)
-                    Error_dict['pdf_dn'] = -round(dataset.pdfdn,8)
-                else:
-                    Error_dict['pdf_up'], Error_dict['pdf_dn'] = 0., 0.
-                if self.main.recasting.THerror_combination == 'linear':
-                    Error_dict['TH_up'] = round(Error_dict['scale_up'] + Error_dict['pdf_up'],8)
-                    Error_dict['TH_dn'] = round(Error_dict['scale_dn'] + Error_dict['pdf_dn'],8)
-                else:
-                    Error_dict['TH_up'] =  round(math.sqrt(Error_dict['pdf_up']**2 + Error_dict['scale_up']**2),8)
-                    Error_dict['TH_dn'] = -round(math.sqrt(Error_dict['pdf_dn']**2 + Error_dict['scale_dn']**2),8)
-                for i in range(0,len(self.main.recasting.systematics)):
-                    for unc in self.main.recasting.systematics:
-                        Error_dict['sys'+str(i)+'_up'] =\
-                            round(math.sqrt(Error_dict['TH_up']**2+self.main.recasting.systematics[i][0]**2),8)
-                        Error_dict['sys'+str(i)+'_dn'] =\
-                           -round(math.sqrt(Error_dict['TH_dn']**2+self.main.recasting.systematics[i][1]**2),8)
-
-                ## Computation of the uncertainties on the limits
-                regiondata_errors = {}
-                if dataset.xsection > 0. and any([x!=0 for x in Error_dict.values()]):
-                    for error_key, error_value in Error_dict.items():
-                        varied_xsec = max(round(dataset.xsection*(1.0+error_value),10),0.0)
-                        if varied_xsec > 0:
-                            xsflag=False
-                            regiondata_errors[error_key] = copy.deepcopy(regiondata)
-                            if error_value!=0.0:
-                                regiondata_errors[error_key] = self.extract_cls(
-                                    regiondata_errors[error_key], regions, varied_xsec, lumi
-                                )
+                jobs.append({
+                    'extrapolated_lumi' : extrapolated_lumi,
+                    'analysis'          : analysis,
+                    'lumi'              : lumi,
+                    'regions'           : regions,
+                    'regiondata'        : regiondata,
+                    'cov_config'        : self.cov_config,
+                    'pyhf_config'       : self.pyhf_config,
+                })
+
+        ## Uncertainties on the rates
+        Error_dict = {}
+        if dataset.scaleup != None:
+            Error_dict['scale_up'] =  round(dataset.scaleup,8)
+            Error_dict['scale_dn'] = -round(dataset.scaledn,8)
+        else:
+            Error_dict['scale_up'], Error_dict['scale_dn'] = 0., 0.
+        if dataset.pdfup != None:
+            Error_dict['pdf_up'] =  round(dataset.pdfup,8)
+            Error_dict['pdf_dn'] = -round(dataset.pdfdn,8)
+        else:
+            Error_dict['pdf_up'], Error_dict['pdf_dn'] = 0., 0.
+        if self.main.recasting.THerror_combination == 'linear':
+            Error_dict['TH_up'] = round(Error_dict['scale_up'] + Error_dict['pdf_up'],8)
+            Error_dict['TH_dn'] = round(Error_dict['scale_dn'] + Error_dict['pdf_dn'],8)
+        else:
+            Error_dict['TH_up'] =  round(math.sqrt(Error_dict['pdf_up']**2 + Error_dict['scale_up']**2),8)
+            Error_dict['TH_dn'] = -round(math.sqrt(Error_dict['pdf_dn']**2 + Error_dict['scale_dn']**2),8)
+        for i in range(0,len(self.main.recasting.systematics)):
+            for unc in self.main.recasting.systematics:
+                Error_dict['sys'+str(i)+'_up'] =\
+                    round(math.sqrt(Error_dict['TH_up']**2+self.main.recasting.systematics[i][0]**2),8)
+                Error_dict['sys'+str(i)+'_dn'] =\
+                   -round(math.sqrt(Error_dict['TH_dn']**2+self.main.recasting.systematics[i][1]**2),8)
+
+        ## Splitting the jobs into independent tasks (one group of uncorrelated regions
+        ## per core, covariance subsets and pyhf profiles) and performing the CLS calculations
+        tasks = []
+        for ijob, job in enumerate(jobs):
+            nchunks = min(self.get_ncores(), len(job['regions']))
+            for ichunk in range(nchunks):
+                start = (ichunk*len(job['regions']))//nchunks
+                stop  = ((ichunk+1)*len(job['regions']))//nchunks
+                tasks.append((ijob, job['regions'][start:stop], {}, {}))
+            for cov_subset, item in job['cov_config'].items():
+                tasks.append((ijob, [], {cov_subset: item}, {}))
+            for likelihood_profile, config in job['pyhf_config'].items():
+                tasks.append((ijob, [], {}, OrderedDict([(likelihood_profile, config)])))
+        task_args = [(jobs[ijob], regs, cov, pyhf, dataset.xsection, Error_dict) for ijob, regs, cov, pyhf in tasks]
+
+        ## Tasks whose inputs are unchanged are taken from the result cache
+        results, cache, keys = [None]*len(task_args), None, []
+        if self.main.recasting.CLs_cache:
+            cache = ResultCache(os.path.join(self.dirname, 'Output', 'SAF', 'CLs_cache.db'))
+            keys  = [self.cls_task_key(cache, *args) if self.cls_task_cacheable(args[1], args[2]) else None
+                     for args in task_args]
+            results = [cache.get(key) if key is not None else None for key in keys]
+            self.logger.debug(str(len([x for x in results if x is not None])) + '/' + str(len(results)) +
+                              ' CLs calculations taken from the cache')
+        todo = [i for i, result in enumerate(results) if result is None]
+        for i, result in zip(todo, self.run_cls_tasks([task_args[i] for i in todo])):
+            results[i] = result
+            if cache is not None and keys[i] is not None:
+                cache.set(keys[i], result)
+        if cache is not None:
+            cache.close()
+
+        ## Gathering the results
+        for job in jobs:
+            job['regiondata_errors'] = {}
+        for (ijob, _, _, _), (regiondata, regiondata_errors) in zip(tasks, results):
+            job = jobs[ijob]
+            merge_regiondata(job['regiondata'], regiondata)
+            for error_key, error_data in regiondata_errors.items():
+                merge_regiondata(job['regiondata_errors'].setdefault(error_key, {}), error_data)
+        for job in jobs:
+            self.cov_config, self.pyhf_config = job['cov_config'], job['pyhf_config']
+            if dataset.xsection > 0:
+                self.flag_best_regions(job['regiondata'], job['regions'])
+                for error_data in job['regiondata_errors'].values():
+                    self.flag_best_regions(error_data, job['regions'])
+
+        ## Writing the output files
+        xsflag = (dataset.xsection <= 0)
+        for extrapolated_lumi in ['default']+self.main.recasting.extrapolated_luminosities:
+            ## Preparing the output file and checking whether a cross section has been defined
+            outext  = "" if extrapolated_lumi == 'default' else "_lumi_{:.3f}".format(extrapolated_lumi)
+            outfile = os.path.join(self.dirname, 'Output/SAF',
+                                   dataset.name, 'CLs_output'+outext+'.dat')
+            if os.path.isfile(outfile):
+                mysummary=open(outfile,'a+')
+                mysummary.write("\n")
+            else:
+                mysummary=open(outfile,'w')
+                self.write_cls_header(dataset.xsection, mysummary)
 
+            for job in [x for x in jobs if x['extrapolated_lumi'] == extrapolated_lumi]:
+                self.cov_config, self.pyhf_config = job['cov_config'], job['pyhf_config']
                 ## writing the output file
                 self.write_cls_output(
-                    analysis, regions, regiondata, regiondata_errors, mysummary, xsflag, lumi
+                    job['analysis'], job['regions'], job['regiondata'], job['regiondata_errors'],
+                    mysummary, xsflag, job['lumi']
                 )
                 mysummary.write('\n')
 
@@ -894,6 +1068,135 @@ class RunRecast():
             mysummary.close()
         return True
 
+    def get_ncores(self):
+        """Number of cores to be used by the recasting machinery (asked only once)."""
+        if self.ncores is None:
+            self.ncores = LibraryWriter('lib',self.main).get_ncores2()
+        return self.ncores
+
+    def run_cls_tasks(self, tasks):
+        """
+        Runs the CLs calculation tasks, in parallel through a pool of processes when
+        several cores are available. The results are returned in the order of the tasks.
+        """
+        ncores = min(self.get_ncores(), len(tasks))
+        if ncores > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            global _cls_runner
+            self.toy_cache.get_seed()
+            _cls_runner = self
+            try:
+                pool = multiprocessing.get_context('fork').Pool(ncores)
+                try:
+                    return pool.map(_solve_cls_task, tasks, chunksize=1)
+                finally:
+                    pool.close()
+                    pool.join()
+            except Exception as err:
+                self.logger.debug(str(err))
+                self.logger.warning('The parallel CLs calculation failed, running it serially.')
+            finally:
+                _cls_runner = None
+        return [self.solve_cls(*task) for task in tasks]
+
+    def cls_task_cacheable(self, regions, cov_config):
+        """
+        Can the result of a CLs calculation task be reused? The toy-based calculations
+        (native calculator, simplified likelihoods) are only reproducible with a fixed seed.
+        """
+        if self.main.recasting.CLs_seed is not None:
+            return True
+        return cov_config == {} and (regions == [] or self.cls_calculator is not cls)
+
+    def cls_task_key(self, cache, job, regions, cov_config, pyhf_config, xsection, Error_dict):
+        """
+        Digest of all the inputs of a CLs calculation task, used to index the result cache.
+        The sources of the calculators are part of it, so that the results computed by
+        another version of the code are not reused.
+        """
+        regiondata = self.cls_task_regiondata(job, regions, cov_config, pyhf_config, deep=False)
+        workspaces = [cache.file_digest(os.path.join(config['path'], config['name']))
+                      for config in pyhf_config.values()]
+        recasting = self.main.recasting
+        misc      = os.path.dirname(os.path.abspath(__file__))
+        sources   = [cache.file_digest(os.path.join(misc, x)) for x in
+                     ['run_recast.py', 'simplified_likelihood.py', 'histfactory_reader.py']]
+        return cache.key(
+            sources, regions, regiondata, cov_config, pyhf_config, workspaces, job['lumi'],
+            job['extrapolated_lumi'] == 'default', xsection, Error_dict,
+            recasting.CLs_calculator_backend, self.is_apriori, self.ntoys, recasting.CLs_seed
+        )
+
+    @staticmethod
+    def cls_task_regiondata(job, regions, cov_config, pyhf_config, deep=True):
+        """
+        Information of the signal regions used by a CLs calculation task (its regions,
+        the regions of its covariance subsets and pyhf profiles), copied if requested.
+        """
+        needed = set(regions)
+        for config in cov_config.values():
+            needed.update(config['cov_regions'])
+        for config in pyhf_config.values():
+            for key, item in config.get('SR', {}).items():
+                if key != 'lumi':
+                    needed.update(item['data'])
+        regiondata = dict([(key, value) for key, value in job['regiondata'].items()
+                           if key in needed or key not in job['regions']])
+        return copy.deepcopy(regiondata) if deep else regiondata
+
+    def solve_cls(self, job, regions, cov_config, pyhf_config, xsection, Error_dict):
+        """
+        Performs the CLS calculation for a subset of the signal regions, covariance
+        subsets and pyhf profiles of an analysis.
+
+        Returns
+        -------
+        regiondata : Dict
+            the region information, with the limits and CLs values
+        regiondata_errors : Dict
+            the CLs values for the varied cross sections
+        """
+        self.cov_config, self.pyhf_config = cov_config, pyhf_config
+        lumi       = job['lumi']
+        regiondata = self.cls_task_regiondata(job, regions, cov_config, pyhf_config)
+
+        regiondata=self.extract_sig_cls(regiondata,regions,lumi,"exp")
+        if self.cov_config != {}:
+            regiondata=self.extract_sig_lhcls(regiondata,lumi,"exp")
+        # CLs calculation for pyhf
+        regiondata = self.pyhf_sig95Wrapper(lumi, regiondata, "exp")
+
+        if job['extrapolated_lumi']=='default':
+            if self.cov_config != {}:
+                regiondata=self.extract_sig_lhcls(regiondata,lumi,"obs")
+            regiondata = self.extract_sig_cls(regiondata,regions,lumi,"obs")
+            regiondata = self.pyhf_sig95Wrapper(lumi,regiondata,'obs')
+        else:
+            for reg in [x for x in job['regions'] if x in regiondata]:
+                regiondata[reg]["nobs"]=regiondata[reg]["nb"]
+        if xsection > 0:
+            regiondata=self.extract_cls(regiondata,regions,xsection,lumi)
+
+        ## Computation of the uncertainties on the limits
+        regiondata_errors = {}
+        if xsection > 0. and any([x!=0 for x in Error_dict.values()]):
+            for error_key, error_value in Error_dict.items():
+                varied_xsec = max(round(xsection*(1.0+error_value),10),0.0)
+                if varied_xsec > 0:
+                    regiondata_errors[error_key] = copy.deepcopy(regiondata)
+                    if error_value!=0.0:
+                        regiondata_errors[error_key] = self.extract_cls(
+                            regiondata_errors[error_key], regions, varied_xsec, lumi
+                        )
+
+        ## Keeping only the pieces of information computed here
+        def select(data):
+            output = dict([(reg, data[reg]) for reg in regions])
+            for key, config in [('cov_subset', cov_config), ('pyhf', pyhf_config)]:
+                if key in data:
+                    output[key] = dict([(k, data[key][k]) for k in config if k in data[key]])
+            return output
+        return select(regiondata), dict([(k, select(v)) for k, v in regiondata_errors.items()])
+
     def check_xml_scipy_methods(self):
         ## Checking whether scipy is installed
         if not self.main.session_info.has_scipy:
@@ -1321,11 +1624,10 @@ class RunRecast():
 
     def read_cutflows(self, path, regions, regiondata):
         self.logger.debug('Read the cutflow from the files:')
+        cutflows = ReadCutflows(path)
         for reg in regions:
             regname = clean_region_name(reg)
             ## getting the initial and final number of events
-            IsInitial = False
-            IsCounter = False
             N0 = 0.
             Nf = 0.
             ## checking if regions must be combined
@@ -1337,27 +1639,14 @@ class RunRecast():
                     self.logger.warning('Cannot find a cutflow for the region '+regiontocombine+' in ' + path)
                     self.logger.warning('Skipping the CLs calculation.')
                     return -1
-                mysaffile = open(filename)
                 myN0=-1
                 myNf=-1
-                for line in mysaffile:
-                    if "<InitialCounter>" in line:
-                        IsInitial = True
-                        continue
-                    elif "</InitialCounter>" in line:
-                        IsInitial = False
-                        continue
-                    elif "<Counter>" in line:
-                        IsCounter = True
-                        continue
-                    elif "</Counter>" in line:
-                        IsCounter = False
-                        continue
-                    if IsInitial and "sum of weights" in line and not '^2' in line:
-                        myN0 = float(line.split()[0])+float(line.split()[1])
-                    if IsCounter and "sum of weights" in line and not '^2' in line:
-                        myNf = float(line.split()[0])+float(line.split()[1])
-                mysaffile.close()
+                if os.path.normpath(filename) in cutflows:
+                    initial, counters, _ = cutflows[os.path.normpath(filename)]
+                    if initial is not None:
+                        myN0 = initial.sumw_pos+initial.sumw_neg
+                    if len(counters) != 0:
+                        myNf = counters[-1].sumw_pos+counters[-1].sumw_neg
                 if myNf==-1 or myN0==-1:
                     self.logger.warning('Invalid cutflow for the region ' + reg +'('+regname+') in ' + path)
                     self.logger.warning('Skipping the CLs calculation.')
@@ -1374,9 +1663,7 @@ class RunRecast():
 
     def extract_cls(self,regiondata,regions,xsection,lumi):
         self.logger.debug('Compute CLs...')
-        ## computing fi a region belongs to the best expected ones, and derive the CLs in all cases
-        bestreg=[]
-        rMax = -1
+        ## deriving the CLs in all cases
         for reg in regions:
             nsignal = xsection * lumi * 1000. * regiondata[reg]["Nf"] / regiondata[reg]["N0"]
             nb      = regiondata[reg]["nb"]
@@ -1388,20 +1675,11 @@ class RunRecast():
             else:
                 n95     = float(regiondata[reg]["s95exp"]) * lumi * 1000. * regiondata[reg]["Nf"] / regiondata[reg]["N0"]
                 rSR     = nsignal/n95
-                myCLs   = self.cls_calculator(nobs, nb, deltanb, nsignal, self.ntoys, CLs_obs = True)
+                myCLs   = self.region_cls(reg, nobs, nb, deltanb, nsignal, CLs_obs = True)
             regiondata[reg]["rSR"] = rSR
             regiondata[reg]["CLs"] = myCLs
-            if rSR > rMax:
-                regiondata[reg]["best"]=1
-                for mybr in bestreg:
-                    regiondata[mybr]["best"]=0
-                bestreg = [reg]
-                rMax = rSR
-            else:
-                regiondata[reg]["best"]=0
 
         if self.cov_config != {}:
-            minsig95, bestreg = 1e99, []
             for cov_subset in self.cov_config.keys():
                 cov_regions = self.cov_config[cov_subset]["cov_regions"]
                 covariance  = self.cov_config[cov_subset]["covariance" ]
@@ -1409,20 +1687,10 @@ class RunRecast():
                     regiondata["cov_subset"][cov_subset]["CLs"]= 0.
                     continue
                 CLs = self.slhCLs(regiondata,cov_regions,xsection,lumi,covariance, ntoys = self.ntoys)
-                s95 = float(regiondata["cov_subset"][cov_subset]["s95exp"])
                 regiondata["cov_subset"][cov_subset]["CLs"] = CLs
-                if 0. < s95 < minsig95:
-                    regiondata['cov_subset'][cov_subset]["best"] = 1
-                    for mybr in bestreg:
-                        regiondata['cov_subset'][mybr]["best"]=0
-                    bestreg = [cov_subset]
-                    minsig95 = s95
-                else:
-                    regiondata['cov_subset'][cov_subset]["best"]=0
 
         #initialize pyhf for cls calculation
         iterator = [] if self.pyhf_config=={} else copy.deepcopy(list(self.pyhf_config.items()))
-        minsig95, bestreg = 1e99, []
         for n, (likelihood_profile, config) in enumerate(iterator):
             self.logger.debug('    * Running CLs for '+likelihood_profile)
             # safety check, just in case
@@ -1445,15 +1713,41 @@ class RunRecast():
                 regiondata['pyhf'][likelihood_profile]['full_CLs_output'] = CLs
                 if CLs_out >= 0.:
                     regiondata['pyhf'][likelihood_profile]['CLs']  = CLs_out
-                s95 = float(regiondata['pyhf'][likelihood_profile]['s95exp'])
+        return self.flag_best_regions(regiondata, regions)
+
+    def flag_best_regions(self, regiondata, regions):
+        """
+        Flags the signal region with the best expected sensitivity, as well as the
+        covariance subset and the pyhf profile with the smallest expected limit.
+        """
+        ## computing if a region belongs to the best expected ones
+        bestreg=[]
+        rMax = -1
+        for reg in regions:
+            if regiondata[reg]["rSR"] > rMax:
+                regiondata[reg]["best"]=1
+                for mybr in bestreg:
+                    regiondata[mybr]["best"]=0
+                bestreg = [reg]
+                rMax = regiondata[reg]["rSR"]
+            else:
+                regiondata[reg]["best"]=0
+
+        for group, keys in [("cov_subset", list(self.cov_config.keys())),
+                            ("pyhf",       list(self.pyhf_config.keys()))]:
+            minsig95, bestreg = 1e99, []
+            for key in keys:
+                if "CLs" not in regiondata.get(group, {}).get(key, {}):
+                    continue
+                s95 = float(regiondata[group][key].get("s95exp", -1))
                 if 0. < s95 < minsig95:
-                    regiondata['pyhf'][likelihood_profile]["best"] = 1
+                    regiondata[group][key]["best"] = 1
                     for mybr in bestreg:
-                        regiondata['pyhf'][mybr]["best"]=0
-                    bestreg = [likelihood_profile]
+                        regiondata[group][mybr]["best"]=0
+                    bestreg = [key]
                     minsig95 = s95
                 else:
-                    regiondata['pyhf'][likelihood_profile]["best"]=0
+                    regiondata[group][key]["best"]=0
         return regiondata
 
 
@@ -1464,27 +1758,45 @@ class RunRecast():
             likelihood method (see CMS-NOTE-2017-001 for more information). It relies on the
             simplifiedLikelihood.py code designed by Wolfgang Waltenberger. The method
             returns the computed CLs value. """
+        return RunRecast.slhCLs_scan(regiondata,cov_regions,lumi,covariance,expected,ntoys)(xsection)
+
+
+    @staticmethod
+    def slhCLs_scan(regiondata,cov_regions,lumi,covariance,expected=False, ntoys = 10000):
+        """ Same as slhCLs, but returns the CLs as a function of the cross section. The
+            simplified likelihood model is set up once for a reference cross section of
+            1 pb, each cross section being then tested as a signal strength. """
         observed, backgrounds, nsignal = [], [], []
         # Collect the input data necessary for the simplified_likelyhood.py method
         for reg in cov_regions:
-            nsignal.append(xsection*lumi*1000.*regiondata[reg]["Nf"]/regiondata[reg]["N0"])
+            nsignal.append(lumi*1000.*regiondata[reg]["Nf"]/regiondata[reg]["N0"])
             backgrounds.append(regiondata[reg]["nb"])
             observed.append(regiondata[reg]["nobs"])
         # data
         from madanalysis.misc.simplified_likelihood import Data
         LHdata = Data(observed, backgrounds, covariance, None, nsignal)
-        from madanalysis.misc.simplified_likelihood import CLsComputer
-        computer = CLsComputer(ntoys = ntoys, cl = .95)
+        if LHdata.zeroSignal():
+            return lambda xsection: None
+        from madanalysis.misc.simplified_likelihood import CLsScan
         # calculation and output
         try:
-            return computer.computeCLs(LHdata, expected=expected)
+            scan = CLsScan(LHdata, toys = ntoys, expected=expected)
         except Exception as err:
             logging.getLogger('MA5').debug("slhCLs : " + str(err))
-            return 0.0
+            return lambda xsection: 0.0
+        def CLs(xsection):
+            try:
+                return scan.computeCLs(xsection)
+            except Exception as err:
+                logging.getLogger('MA5').debug("slhCLs : " + str(err))
+                return 0.0
+        return CLs
 
 
     def extract_sig_cls(self,regiondata,regions,lumi,tag):
         self.logger.debug('Compute signal CL...')
+        if self.cls_calculator is asymptotic_cls:
+            return self.extract_sig_asymptotic_cls(regiondata,regions,lumi,tag)
         for reg in regions:
             nb = regiondata[reg]["nb"]
             nobs = regiondata[reg]["nobs"]
@@ -1496,8 +1808,8 @@ class RunRecast():
                 if regiondata[reg]["Nf"]<=0.:
                     return 0
                 nsignal=xsection * lumi * 1000. * regiondata[reg]["Nf"] / regiondata[reg]["N0"]
-                return self.cls_calculator(
-                    nobs, nb, deltanb, nsignal, self.ntoys, **{"CLs_"+tag : True}
+                return self.region_cls(
+                    reg, nobs, nb, deltanb, nsignal, **{"CLs_"+tag : True}
                 ) - 0.95
 
             nslow = lumi * 1000. * regiondata[reg]["Nf"] / regiondata[reg]["N0"]
@@ -1508,10 +1820,10 @@ class RunRecast():
                 continue
 
             low,hig = 1., 1.
-            while self.cls_calculator(nobs,nb,deltanb,nslow,self.ntoys, **{"CLs_"+tag : True})>0.95:
+            while self.region_cls(reg,nobs,nb,deltanb,nslow, **{"CLs_"+tag : True})>0.95:
                 self.logger.debug('region ' + reg + ', lower bound = ' + str(low))
                 nslow*=0.1; low  *=0.1
-            while self.cls_calculator(nobs,nb,deltanb,nshig,self.ntoys, **{"CLs_"+tag : True})<0.95:
+            while self.region_cls(reg,nobs,nb,deltanb,nshig, **{"CLs_"+tag : True})<0.95:
                 self.logger.debug('region ' + reg + ', upper bound = ' + str(hig))
                 nshig*=10.; hig  *=10.
 
@@ -1528,6 +1840,55 @@ class RunRecast():
 
         return regiondata
 
+    def extract_sig_asymptotic_cls(self,regiondata,regions,lumi,tag):
+        """
+        Compute the upper limits on the cross section of all signal regions at once
+        with the asymptotic CLs calculator. The 95% CL limits are obtained through a
+        bisection in log(xsection) that is vectorised over the signal regions.
+
+        Parameters
+        ----------
+        regiondata : Dict
+            Dictionary including all the information about SR yields
+        regions : list
+            list of signal regions
+        lumi : float
+            luminosity
+        tag : str
+            expected or observed
+        """
+        import numpy
+        nb      = numpy.array([regiondata[reg]["nb"] for reg in regions], dtype=float)
+        deltanb = numpy.array([regiondata[reg]["deltanb"] for reg in regions], dtype=float)
+        if tag == "exp" and self.is_apriori:
+            nobs = nb
+        else:
+            nobs = numpy.array([regiondata[reg]["nobs"] for reg in regions], dtype=float)
+        nsignal = numpy.array(
+            [lumi * 1000. * regiondata[reg]["Nf"] / regiondata[reg]["N0"] for reg in regions], dtype=float
+        )
+
+        def sig95(logxsection):
+            return asymptotic_cls(nobs, nb, deltanb, nsignal * 10.**logxsection) - 0.95
+
+        low, hig = numpy.full(len(regions), -10.), numpy.full(len(regions), 10.)
+        valid    = (nsignal > 0.) & (sig95(low) < 0.) & (sig95(hig) > 0.)
+        for _ in range(60):
+            mid   = .5*(low + hig)
+            below = sig95(mid) < 0.
+            low   = numpy.where(below, mid, low)
+            hig   = numpy.where(below, hig, mid)
+        s95 = numpy.where(valid, 10.**(.5*(low + hig)), -1.)
+
+        for reg, nsig, limit in zip(regions, nsignal, s95):
+            if nsig <= 0.:
+                regiondata[reg]["s95"+tag] = "-1"
+                continue
+            self.logger.debug('region ' + reg + ', s95 = ' + str(limit) + ' pb')
+            regiondata[reg]["s95"+tag] = ("%-20.7f" % limit)
+
+        return regiondata
+
     # Calculating the upper limits on sigma with simplified likelihood
     def extract_sig_lhcls(self,regiondata,lumi,tag):
         """
@@ -1546,11 +1907,6 @@ class RunRecast():
         if "cov_subset" not in regiondata.keys():
             regiondata["cov_subset"] = {}
 
-        def get_s95(regs, matrix):
-            def sig95(xsection):
-                return self.slhCLs(regiondata,regs,xsection,lumi,matrix,(tag=="exp"), ntoys = self.ntoys)-0.95
-            return sig95
-
         for cov_subset in self.cov_config.keys():
             cov_regions = self.cov_config[cov_subset]["cov_regions"]
             covariance  = self.cov_config[cov_subset]["covariance" ]
@@ -1560,20 +1916,20 @@ class RunRecast():
                 regiondata["cov_subset"][cov_subset]["s95"+tag]= "-1"
                 continue
 
+            CLs = self.slhCLs_scan(regiondata,cov_regions,lumi,covariance,(tag=="exp"), ntoys = self.ntoys)
             low, hig = 1., 1.
-            while self.slhCLs(regiondata,cov_regions,low,lumi,covariance,(tag=="exp"), ntoys = self.ntoys)>0.95:
+            while CLs(low)>0.95:
                 self.logger.debug('lower bound = ' + str(low))
                 low *= 0.1
                 if low < 1e-10: break
-            while self.slhCLs(regiondata,cov_regions,hig,lumi,covariance,(tag=="exp"), ntoys = self.ntoys)<0.95:
+            while CLs(hig)<0.95:
                 self.logger.debug('upper bound = ' + str(hig))
                 hig *= 10.
                 if hig > 1e10: break
 
             try:
                 import scipy
-                sig95 = get_s95(cov_regions, covariance)
-                s95 = scipy.optimize.brentq(sig95,low,hig,xtol=low/100.)
+                s95 = scipy.optimize.brentq(lambda xsec: CLs(xsec)-0.95,low,hig,xtol=low/100.)
             except ImportError as err:
                 self.logger.debug("Can't import scipy")
                 s95=-1
@@ -1593,17 +1949,22 @@ class RunRecast():
         if 'pyhf' not in list(regiondata.keys()):
             regiondata['pyhf'] = {}
 
-        def get_pyhf_result(*args):
-            rslt = pyhf_wrapper(*args)
+        def get_result(rslt):
             if tag == "exp" and not self.is_apriori:
                 return rslt["CLs_exp"][2]
             return rslt['CLs_obs']
 
-        def sig95(conf, regdat, bkg):
-            def CLs(xsec):
-                signal = HF_Signal(conf, regdat, xsection=xsec)
-                return get_pyhf_result(bkg(lumi), signal(lumi))-0.95
-            return CLs
+        def get_CLs(conf, regdat, bkg):
+            # The signal yields being linear in the cross section, the model is built
+            # once for a reference cross section of 1 pb, the cross section being then
+            # given by the signal strength (the POI of the model)
+            model, data = pyhf_model(bkg(lumi), HF_Signal(conf, regdat, xsection=1.)(lumi))
+            if model is not None and model.config.poi_name == 'mu_SIG':
+                return lambda xsec: get_result(pyhf_hypotest(model, data, mu=xsec))
+            self.logger.debug('The POI is not the signal strength, the model is built for each cross section.')
+            return lambda xsec: get_result(
+                pyhf_wrapper(bkg(lumi), HF_Signal(conf, regdat, xsection=xsec)(lumi))
+            )
 
         iterator = [] if self.pyhf_config=={} else copy.deepcopy(list(self.pyhf_config.items()))
         for n, (likelihood_profile, config) in enumerate(iterator):
@@ -1617,15 +1978,14 @@ class RunRecast():
                 regiondata['pyhf'][likelihood_profile]["s95"+tag] = "-1"
                 continue
 
+            CLs = get_CLs(config, regiondata, background)
             low, hig = 1., 1.
-            while get_pyhf_result(background(lumi),\
-                                  HF_Signal(config, regiondata,xsection=low)(lumi)) > 0.95:
+            while CLs(low) > 0.95:
                 self.logger.debug(tag+': profile '+likelihood_profile+\
                                                ', lower bound = '+str(low))
                 low *= 0.1
                 if low < 1e-10: break
-            while get_pyhf_result(background(lumi),\
-                                  HF_Signal(config, regiondata,xsection=hig)(lumi)) < 0.95:
+            while CLs(hig) < 0.95:
                 self.logger.debug(tag+': profile '+likelihood_profile+\
                                                ', higher bound = '+str(hig))
                 hig *= 10.
@@ -1633,7 +1993,7 @@ class RunRecast():
             try:
                 import scipy
                 s95 = scipy.optimize.brentq(
-                    sig95(config, regiondata, background),low,hig,xtol=low/100.
+                    lambda xsec: CLs(xsec)-0.95,low,hig,xtol=low/100.
                 )
             except Exception as err:
                 self.logger.debug(str(err))
@@ -1807,6 +2167,22 @@ class RunRecast():
                 summary.write('\n')
 
 
+def _solve_cls_task(task):
+    """Entry point of the worker processes of `RunRecast.run_cls_tasks`."""
+    return _cls_runner.solve_cls(*task)
+
+
+def merge_regiondata(regiondata, update):
+    """Merges the region information computed by independent CLs tasks."""
+    for key, value in update.items():
+        if key in ['cov_subset', 'pyhf']:
+            for subkey, subvalue in value.items():
+                regiondata.setdefault(key, {}).setdefault(subkey, {}).update(subvalue)
+        else:
+            regiondata.setdefault(key, {}).update(value)
+    return regiondata
+
+
 def clean_region_name(mystr):
     newstr = mystr.replace("/",  "_slash_")
     newstr = newstr.replace("->", "_to_")
@@ -1835,22 +2211,53 @@ def pyhf_wrapper(*args, **kwargs):
         CLs_obs: bool
             return obs values
     """
+    model, data = pyhf_model(*args)
+    if model is None:
+        if kwargs.get("CLs_exp", False) or kwargs.get("CLs_obs", False):
+            return -1
+        return {'CLs_obs':-1 , 'CLs_exp' : [-1]*5}
+
+    CLs = pyhf_hypotest(model, data)
+
+    if kwargs.get("CLs_exp", False):
+        return CLs["CLs_exp"][2]
+    elif kwargs.get("CLs_obs", False):
+        return CLs["CLs_obs"]
+
+    return CLs
+
+
+def pyhf_setup():
+    """
+    Imports and configures pyhf (silenced messages, numpy backend)
+    """
     import pyhf
     from pyhf.optimize import mixins
-    from numpy import warnings, isnan, ndarray
 
     # Scilence pyhf's messages
     pyhf.pdf.log.setLevel(logging.CRITICAL)
     pyhf.workspace.log.setLevel(logging.CRITICAL)
     mixins.log.setLevel(logging.CRITICAL)
     pyhf.set_backend('numpy', precision="64b")
+    return pyhf
+
+
+def pyhf_model(*args):
+    """
+    Builds the pyhf model and the associated data
+
+    :param args: input arguments `nobs, nb, deltanb, nsignal` or `bkg_HF, sig_HF`
+    :return: the model and the data, or (None, None) if the model is invalid
+    """
+    import warnings
+    pyhf = pyhf_setup()
 
     with warnings.catch_warnings():
         warnings.filterwarnings('ignore')
         try:
             if len(args) == 2 and all([isinstance(x, (dict, list)) for x in args]):
                 background, signal = args
-                workspace = pyhf.Workspace(background)
+                workspace = workspace_cache.get_workspace(background)
                 model     = workspace.model(
                     patches=[signal],
                     modifier_settings={'normsys': {'interpcode': 'code4'},
@@ -1868,19 +2275,34 @@ def pyhf_wrapper(*args, **kwargs):
 
         except (pyhf.exceptions.InvalidSpecification, KeyError) as err:
             logging.getLogger('MA5').error("Invalid JSON file!! "+str(err))
-            if kwargs.get("CLs_exp", False) or kwargs.get("CLs_obs", False):
-                return -1
-            return {'CLs_obs':-1 , 'CLs_exp' : [-1]*5}
+            return None, None
         except Exception as err:
             logging.getLogger('MA5').debug("Unknown error, check pyhf_wrapper_py3 "+ str(err))
-            if kwargs.get("CLs_exp", False) or kwargs.get("CLs_obs", False):
-                return -1
-            return {'CLs_obs':-1 , 'CLs_exp' : [-1]*5}
+            return None, None
+
+    return model, data
+
+
+def pyhf_hypotest(model, data, mu=1.):
+    """
+    Computes the CLs values of a pyhf model for a given value of the parameter of interest
+
+    :param model: pyhf model
+    :param data: observed data
+    :param mu: value of the parameter of interest
+    :return: dictionary with the observed and expected 1-CLs values
+    """
+    import warnings
+    from numpy import isnan
+    pyhf = pyhf_setup()
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore')
 
         def get_CLs(**kwargs):
             try:
                 CLs_obs, CLs_exp = pyhf.infer.hypotest(
-                    1., data, model,
+                    mu, data, model,
                     test_stat=kwargs.get("stats", "qtilde"),
                     par_bounds=kwargs.get('bounds', model.config.suggested_bounds()),
                     return_expected_set=True
@@ -1904,6 +2326,10 @@ def pyhf_wrapper(*args, **kwargs):
         #pyhf can raise an error if the poi_test bounds are too stringent
         #they need to be updated dynamically.
         arguments = dict(bounds=model.config.suggested_bounds(), stats="qtilde")
+        if mu >= arguments["bounds"][model.config.poi_index][1]:
+            arguments["bounds"][model.config.poi_index] = (
+                arguments["bounds"][model.config.poi_index][0], 2*mu
+            )
         iteration_limit = 0
         while True:
             CLs = get_CLs(**arguments)
@@ -1935,53 +2361,233 @@ def pyhf_wrapper(*args, **kwargs):
             # hard limit on iteration required if it exceeds this value it means
             # Nsig >>>>> Nobs
             if iteration_limit>=3:
-                if kwargs.get("CLs_exp", False) or kwargs.get("CLs_obs", False):
-                    return 1
                 return {'CLs_obs':1. , 'CLs_exp' : [1.]*5}
 
-    if kwargs.get("CLs_exp", False):
-        return CLs["CLs_exp"][2]
-    elif kwargs.get("CLs_obs", False):
-        return CLs["CLs_obs"]
-
     return CLs
 
 
 def cls(NumObserved, ExpectedBG, BGError, SigHypothesis, NumToyExperiments, **kwargs):
-    import scipy.stats
+    """
+    Computes 1-CLs with the native toy Monte Carlo calculator
+
+    :param NumObserved: number of observed events
+    :param ExpectedBG: expected number of background events
+    :param BGError: uncertainty on the expected number of background events
+    :param SigHypothesis: number of signal events, either a single value or a
+        sequence of signal hypotheses that are all scored against the same set
+        of background toys
+    :param NumToyExperiments: number of toy experiments
+    :param kwargs:
+        rng: numpy.random.Generator
+            random number generator used to draw the toys
+        toys: tuple
+            background toys, as returned by `background_toys`, to be reused
+    :return: 1-CLs as a float, or as a numpy array for a sequence of hypotheses
+    """
+    import numpy
+    if numpy.ndim(SigHypothesis) == 0:
+        return float(cls_batch(NumObserved, ExpectedBG, BGError, [SigHypothesis],
+                               NumToyExperiments, **kwargs)[0])
+    return cls_batch(NumObserved, ExpectedBG, BGError, SigHypothesis, NumToyExperiments, **kwargs)
+
+
+class ToyCache(object):
+    """
+    Cache of the background toys used by the native CLs calculator (common random
+    numbers). The toys of a given (region, nb, deltanb, ntoys, seed) configuration
+    are generated once and reused for every signal hypothesis, so that the CLs
+    objective entering the s95 root finding is a deterministic function of the
+    signal yield. The least recently used entries are evicted first.
+
+    :param seed: seed of the toy experiments (None for a random seed)
+    :param maxsize: maximum number of cached toy sets
+    """
+
+    def __init__(self, seed=None, maxsize=64):
+        self.seed    = seed
+        self.maxsize = maxsize
+        self.toys    = OrderedDict()
+
+    def get(self, region, nb, deltanb, ntoys):
+        """
+        Returns the background toys of a given region, together with the seed to
+        be used for the signal-plus-background toys.
+        """
+        import numpy, zlib
+        key = (region, nb, deltanb, ntoys, self.get_seed())
+        if key in self.toys:
+            self.toys.move_to_end(key)
+            return self.toys[key]
+        bkg_seed, sb_seed = numpy.random.SeedSequence(
+            [self.seed, zlib.crc32(repr(key[:-1]).encode())]
+        ).spawn(2)
+        entry = (background_toys(nb, deltanb, ntoys, rng=numpy.random.default_rng(bkg_seed)), sb_seed)
+        self.toys[key] = entry
+        while len(self.toys) > self.maxsize:
+            self.toys.popitem(last=False)
+        return entry
+
+    def get_seed(self):
+        """Returns the seed of the toys, a random one being drawn if not provided."""
+        if self.seed is None:
+            import numpy
+            self.seed = int(numpy.random.SeedSequence().entropy % 2**63)
+        return self.seed
+
+    def cls(self, region, NumObserved, ExpectedBG, BGError, SigHypothesis, NumToyExperiments):
+        """
+        Same as `cls`, with the background toys taken from the cache.
+        """
+        import numpy
+        toys, sb_seed = self.get(region, ExpectedBG, BGError, NumToyExperiments)
+        return cls(NumObserved, ExpectedBG, BGError, SigHypothesis, NumToyExperiments,
+                   toys=toys, rng=numpy.random.default_rng(sb_seed))
+
+    def clear(self):
+        self.toys.clear()
+
+
+def background_toys(ExpectedBG, BGError, NumToyExperiments, rng=None):
+    """
+    Generates the background-only toy experiments of the native CLs calculator
+
+    :param ExpectedBG: expected number of background events
+    :param BGError: uncertainty on the expected number of background events
+    :param NumToyExperiments: number of toy experiments
+    :param rng: numpy.random.Generator (a fresh one is created if not provided)
+    :return: the Gaussian-distributed expected backgrounds (negative values
+        being discarded) and the associated Poisson-distributed event counts
+    """
+    import numpy
+    if rng is None:
+        rng = numpy.random.default_rng()
     # generate a set of expected-number-of-background-events, one for each toy
     # experiment, distributed according to a Gaussian with the specified mean
     # and uncertainty
-    ExpectedBGs = scipy.stats.norm.rvs(loc=ExpectedBG, scale=BGError, size=NumToyExperiments)
+    ExpectedBGs = rng.normal(loc=ExpectedBG, scale=BGError, size=int(NumToyExperiments))
 
     # Ignore values in the tail of the Gaussian extending to negative numbers
-    ExpectedBGs = [value for value in ExpectedBGs if value > 0]
+    ExpectedBGs = ExpectedBGs[ExpectedBGs > 0.]
 
     # For each toy experiment, get the actual number of background events by
     # taking one value from a Poisson distribution created using the expected
     # number of events.
-    ToyBGs = scipy.stats.poisson.rvs(ExpectedBGs)
-    ToyBGs = list(map(float, ToyBGs))
+    ToyBGs = rng.poisson(ExpectedBGs)
+    return ExpectedBGs, ToyBGs
+
+
+def cls_batch(NumObserved, ExpectedBG, BGError, SigHypotheses, NumToyExperiments,
+              rng=None, toys=None, **kwargs):
+    """
+    Vectorised toy Monte Carlo engine for the native CLs calculator. All signal
+    hypotheses are scored against a single set of background toys.
+
+    :param NumObserved: number of observed events
+    :param ExpectedBG: expected number of background events
+    :param BGError: uncertainty on the expected number of background events
+    :param SigHypotheses: sequence of numbers of signal events
+    :param NumToyExperiments: number of toy experiments
+    :param rng: numpy.random.Generator (a fresh one is created if not provided)
+    :param toys: background toys, as returned by `background_toys`
+    :return: numpy array with the 1-CLs value of each signal hypothesis
+    """
+    import numpy
+    if rng is None:
+        rng = numpy.random.default_rng()
+    if toys is None:
+        toys = background_toys(ExpectedBG, BGError, NumToyExperiments, rng=rng)
+    ExpectedBGs, ToyBGs = toys
+    signals = numpy.asarray(SigHypotheses, dtype=float).reshape(-1)
+    result  = numpy.zeros(signals.shape)
+    if ExpectedBGs.size == 0:
+        return result
 
     # The probability for the background alone to fluctutate as LOW as
     # observed = the fraction of the toy experiments with backgrounds as low as
     # observed = p_b.
     # NB (1 - this p_b) corresponds to what is usually called p_b for CLs.
-    p_b = scipy.stats.percentileofscore(ToyBGs, NumObserved, kind='weak')*.01
-
-    # Toy MC for background+signal
-    ExpectedBGandS = [expectedbg + SigHypothesis for expectedbg in ExpectedBGs]
-    ExpectedBGandS = [x for x in ExpectedBGandS if x > 0]
-    if len(ExpectedBGandS)==0:
-        return 0.
-    ToyBplusS = scipy.stats.poisson.rvs(ExpectedBGandS)
-    ToyBplusS = list(map(float, ToyBplusS))
-
-    # Calculate the fraction of these that are >= the number observed,
-    # giving p_(S+B). Divide by (1 - p_b) a la the CLs prescription.
-    p_SplusB = scipy.stats.percentileofscore(ToyBplusS, NumObserved, kind='weak')*.01
-
-    if p_SplusB>p_b:
-        return 0.
-    else:
-        return 1.-(p_SplusB / p_b) # 1 - CLs
+    p_b = numpy.count_nonzero(ToyBGs <= NumObserved) / float(ToyBGs.size)
+
+    # Toy MC for background+signal, processed by chunks of hypotheses to keep
+    # the memory footprint bounded
+    chunk = max(1, (1 << 22) // ExpectedBGs.size)
+    for start in range(0, signals.size, chunk):
+        ExpectedBGandS = ExpectedBGs[numpy.newaxis, :] + signals[start:start+chunk, numpy.newaxis]
+        positive  = ExpectedBGandS > 0.
+        ToyBplusS = rng.poisson(numpy.where(positive, ExpectedBGandS, 0.))
+
+        # Calculate the fraction of these that are >= the number observed,
+        # giving p_(S+B). Divide by (1 - p_b) a la the CLs prescription.
+        ntoys    = numpy.count_nonzero(positive, axis=1)
+        nbelow   = numpy.count_nonzero(positive & (ToyBplusS <= NumObserved), axis=1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            p_SplusB = nbelow / ntoys.astype(float)
+            cls_val  = 1. - p_SplusB / p_b # 1 - CLs
+        result[start:start+chunk] = numpy.where(
+            (ntoys == 0) | (p_SplusB > p_b), 0., cls_val
+        )
+
+    return result
+
+
+def asymptotic_cls(NumObserved, ExpectedBG, BGError, SigHypothesis, NumToyExperiments=None, **kwargs):
+    """
+    Computes 1-CLs in the asymptotic limit (see arXiv:1007.1727) for a single-bin
+    counting experiment with a Gaussian-constrained background, using the
+    q~mu test statistic and the Asimov dataset. All inputs can be numpy arrays,
+    in which case all regions are handled at once.
+
+    :param NumObserved: number of observed events
+    :param ExpectedBG: expected number of background events
+    :param BGError: uncertainty on the expected number of background events
+    :param SigHypothesis: number of signal events
+    :param NumToyExperiments: unused (for compatibility with the other calculators)
+    :return: 1-CLs as a float, or as a numpy array for array inputs
+    """
+    import numpy
+    from scipy.special import xlogy
+    from scipy.stats   import norm
+
+    nobs, b0, sigma, nsig = numpy.broadcast_arrays(
+        *[numpy.asarray(x, dtype=float) for x in [NumObserved, ExpectedBG, BGError, SigHypothesis]]
+    )
+    valid = nsig > 0.
+    nsig  = numpy.where(valid, nsig, 1.)
+    var   = sigma**2
+
+    def nll(n, mu):
+        # background yield profiled analytically (positive root of the
+        # stationarity condition), and kept non-negative
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            c   = var - mu*nsig - b0
+            lam = .5*(-c + numpy.sqrt(c**2 + 4.*n*var))
+            lam = numpy.where(var > 0., lam, mu*nsig + b0)
+            bkg = numpy.maximum(lam - mu*nsig, 0.)
+            lam = numpy.maximum(mu*nsig + bkg, 1e-300)
+            constraint = numpy.where(var > 0., (bkg - b0)**2/(2.*var), 0.)
+        return lam - xlogy(n, lam) + constraint
+
+    def qmu_tilde(n):
+        muhat = (n - b0) / nsig
+        # unconditional fit, with mu fixed to zero when the best fit is negative
+        nll_hat = numpy.where(muhat < 0., nll(n, 0.), n - xlogy(n, numpy.maximum(n, 1e-300)))
+        qmu     = 2.*(nll(n, 1.) - nll_hat)
+        return numpy.where(muhat > 1., 0., numpy.maximum(qmu, 0.))
+
+    qmu  = qmu_tilde(nobs)
+    qmuA = qmu_tilde(b0)
+
+    sqrtqmu, sqrtqmuA = numpy.sqrt(qmu), numpy.sqrt(qmuA)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # test statistic shifted such that the background-only hypothesis is centred on zero
+        teststat = numpy.where(
+            sqrtqmu <= sqrtqmuA, sqrtqmu - sqrtqmuA, (qmu - qmuA)/(2.*sqrtqmuA)
+        )
+        CLsb = norm.sf(teststat + sqrtqmuA)
+        CLb  = norm.sf(teststat)
+        CLs  = numpy.where(CLb > 0., CLsb/CLb, 1.)
+    result = numpy.where(valid, numpy.clip(1. - CLs, 0., 1.), 0.)
+
+    if result.ndim == 0:
+        return float(result)
+    return result
@@ -38,7 +38,6 @@ from __future__ import absolute_import
 from scipy import stats, optimize, integrate, special
 from scipy import __version__ as scipy_version
 from numpy  import sqrt, exp, log, sign, array, ndarray
-from functools import reduce
 import numpy as NP
 import math, copy, logging
 import copy
@@ -244,6 +243,34 @@ class Data:
                 self.corr[y][x]=rho
         return self.corr
 
+    def sampleV(self, size):
+        """
+        Draws size sets of nuisance parameters from the multivariate normal
+        distribution of covariance V, as a (size, n) matrix. The Cholesky
+        factor of V is computed only once.
+        """
+
+        if not hasattr(self, "choleskyV"):
+            try:
+                self.choleskyV = NP.linalg.cholesky(self.V)
+            except NP.linalg.LinAlgError:
+                self.choleskyV = None
+        if self.choleskyV is None:
+            ## semi-definite matrix
+            thetas = stats.multivariate_normal.rvs(mean=[0.]*self.n, cov=self.V, size=size)
+            return NP.reshape(thetas, (size, self.n))
+        return NP.dot(NP.random.standard_normal((size, self.n)), self.choleskyV.T)
+
+    def inverseV(self):
+        """
+        Inverse of the covariance matrix V, computed only once.
+        Convenience function.
+        """
+
+        if not hasattr(self, "invV"):
+            self.invV = NP.linalg.inv(self.V)
+        return self.invV
+
     def signals(self, mu):
         """
         Returns the number of expected signal events, for all datasets,
@@ -278,16 +305,17 @@ class LikelihoodComputer:
         
         #Define relative signal strengths:
         denominator = mu*signal_rel  + self.model.backgrounds + theta_hat
-
-        for ctr,d in enumerate(denominator):
-            if d == 0.:
-                if (self.model.observed[ctr]*signal_rel[ctr]) == 0.:
-                #    logger.debug("zero denominator, but numerator also zero, so we set denom to 1.")
-                    denominator[ctr]=1.
-                else:
-                    raise Exception("we have a zero value in the denominator at pos "+\
-                                    "%d, with a non-zero numerator. dont know how to handle." % ctr)
-        ret = self.model.observed*signal_rel/denominator - signal_rel
+        numerator   = self.model.observed*signal_rel
+
+        zeroes = (denominator == 0.)
+        if zeroes.any():
+            if (numerator[zeroes] != 0.).any():
+                ctr = NP.flatnonzero(zeroes & (numerator != 0.))[0]
+                raise Exception("we have a zero value in the denominator at pos "+\
+                                "%d, with a non-zero numerator. dont know how to handle." % ctr)
+            # zero denominator, but numerator also zero, so we set denom to 1.
+            denominator = NP.where(zeroes, 1., denominator)
+        ret = numerator/denominator - signal_rel
         
         if type(ret) in [ array, ndarray, list ]:
             ret = sum(ret)
@@ -381,28 +409,13 @@ class LikelihoodComputer:
         else:
             lmbda = self.nsig + self.model.A + theta + self.model.C * theta**2 / self.model.B**2
         lmbda[lmbda<=0.] = 1e-30 ## turn zeroes to small values
+        # Poisson and Gaussian log terms, the inverse and the determinant of the
+        # covariance matrix being computed once per profiling (see findThetaHat)
+        poisson  = special.xlogy( self.model.observed, lmbda ) - lmbda - self.gammaln
+        gaussian = - 0.5 * NP.dot( theta, NP.dot( self.weight, theta ) ) - self.lognorm
         if nll:
-            #poisson = self.model.observed * log ( lmbda ) - lmbda #- self.gammaln
-            poisson = stats.poisson.logpmf( self.model.observed, lmbda )
-            #print ( "p",poisson,poisson2 )
-        else:
-            poisson = stats.poisson.pmf( self.model.observed, lmbda )
-            #print ( "nonll",poisson )
-        try:
-            M = [0.]*len(theta)
-            C = self.model.V
-            if self.model.n == 1:
-                C = self.model.totalCovariance(self.nsig)
-            if nll:
-                gaussian = stats.multivariate_normal.logpdf(theta,mean=M,cov=C)
-                ret = - gaussian - sum(poisson)
-            else:
-                gaussian = stats.multivariate_normal.pdf(theta,mean=M,cov=C)
-                ret = gaussian * ( reduce(lambda x, y: x*y, poisson) )
-            return ret
-        except ValueError as e:
-            raise Exception("ValueError %s, %s" % ( e, self.model.totalCovariance(self.nsig) ))
-            # raise Exception("ValueError %s, %s" % ( e, self.model.V ))
+            return - gaussian - NP.sum(poisson)
+        return exp( gaussian + NP.sum(poisson) )
 
     def nll( self, theta ):
         """ probability, for nuicance parameters theta,
@@ -451,7 +464,6 @@ class LikelihoodComputer:
             ## for now deal with variances only
             ntot = nb + nsig
             cov = NP.array(sigma2)
-            weight = NP.linalg.inv(cov)  ## weight matrix
             diag_cov = NP.diag(cov)
             # first: no covariances:
             q = diag_cov * ( ntot - nobs )
@@ -461,14 +473,12 @@ class LikelihoodComputer:
             thetamaxes.append ( thetamax )
             ndims = len(p)
             def distance ( theta1, theta2 ):
-                for ctr,i in enumerate ( theta1 ):
-                    if i == 0.:
-                        theta1[ctr]=1e-20
-                for ctr,i in enumerate ( theta2 ):
-                    if i == 0.:
-                        theta2[ctr]=1e-20
-                return sum ( NP.abs(theta1 - theta2) / NP.abs ( theta1+theta2 ) )
+                theta1[theta1==0.] = 1e-20
+                theta2[theta2==0.] = 1e-20
+                return NP.sum ( NP.abs(theta1 - theta2) / NP.abs ( theta1+theta2 ) )
 
+            if max_iterations > 0:
+                weight = NP.linalg.inv(cov)  ## weight matrix
             ictr = 0
             while ictr < max_iterations:
                 ictr += 1
@@ -509,14 +519,23 @@ class LikelihoodComputer:
             ## quadratic equations
             ini = self.getThetaHat ( self.model.observed, self.model.backgrounds, nsig, self.model.covariance, 0 )
             self.cov_tot = self.model.V
+            self.weight = None
             if self.model.n == 1:
                 self.cov_tot = self.model.totalCovariance ( nsig )
+            else:
+                self.weight = self.model.inverseV()
             # self.ntot = self.model.backgrounds + self.nsig
             # if not self.model.isLinear():
                 # self.cov_tot = self.model.V + self.model.var_s(nsig)
                 # self.cov_tot = self.model.totalCovariance (nsig)
                 #self.ntot = None
-            self.weight = NP.linalg.inv(self.cov_tot)
+            if self.weight is None:
+                self.weight = NP.linalg.inv(self.cov_tot)
+            ## normalisation of the gaussian term of the likelihood
+            sign_det, logdet = NP.linalg.slogdet(2.*NP.pi*NP.array(self.cov_tot, dtype=float))
+            if sign_det <= 0.:
+                raise Exception("the covariance matrix is not positive definite: %s" % self.cov_tot)
+            self.lognorm = 0.5 * logdet
             self.ones = 1.
             if type ( self.model.observed) in [ list, ndarray ]:
                 self.ones = NP.ones ( len (self.model.observed) )
@@ -638,32 +657,20 @@ class LikelihoodComputer:
             if self.model.isLinear() and self.model.n == 1: ## 1-dimensional non-skewed llhds we can integrate analytically
                 return self.marginalizedLLHD1D ( nsig, nll )
 
-            vals=[]
             self.gammaln = special.gammaln(self.model.observed + 1)
-            thetas = stats.multivariate_normal.rvs(mean=[0.]*self.model.n,
-                          # cov=(self.model.totalCovariance(nsig)),
-                          cov=self.model.V,
-                          size=self.ntoys ) ## get ntoys values
-            for theta in thetas :
-                if self.model.isLinear():
-                    lmbda = nsig + self.model.backgrounds + theta
-                else:
-                    lmbda = nsig + self.model.A + theta + self.model.C*theta**2/self.model.B**2
-                if self.model.isScalar( lmbda ):
-                    lmbda = array([lmbda])
-                for ctr,v in enumerate( lmbda ):
-                    if v<=0.: lmbda[ctr]=1e-30
-#                    print ( "lmbda=",lmbda )
-                poisson = self.model.observed*NP.log(lmbda) - lmbda - self.gammaln
-                # poisson = NP.exp(self.model.observed*NP.log(lmbda) - lmbda - self.model.backgrounds - self.gammaln)
-                vals.append( NP.exp ( sum(poisson) ) )
-                #vals.append ( reduce(lambda x, y: x*y, poisson) )
-            mean = NP.mean( vals )
+            ## all the toys at once, as a (ntoys, nSR) matrix
+            thetas = self.model.sampleV(self.ntoys)
+            if self.model.isLinear():
+                lmbda = nsig + self.model.backgrounds + thetas
+            else:
+                lmbda = nsig + self.model.A + thetas + self.model.C*thetas**2/self.model.B**2
+            lmbda[lmbda<=0.] = 1e-30
+            ## log of the product of the poissonians, for each toy
+            poisson = NP.sum(special.xlogy(self.model.observed, lmbda) - lmbda - self.gammaln, axis=1)
             if nll:
-                if mean == 0.:
-                    mean = 1e-100
-                mean = - log ( mean )
-            return mean
+                # -log of the mean of the likelihoods, without underflow
+                return - ( special.logsumexp(poisson) - log(len(poisson)) )
+            return NP.mean( NP.exp(poisson) )
 
 
     def profileLikelihood( self, nsig, nll ):
@@ -864,56 +871,71 @@ class CLsComputer:
             return None
         if toys==None:
             toys=self.ntoys
-        oldmodel = model
+        return CLsScan(model, marginalize=marginalize, toys=toys, expected=expected).computeCLs(1.)
+
+
+class CLsScan:
+    """ Exclusion confidence levels of a fixed statistical model (observed yields,
+        backgrounds, covariance and signal shape) for any signal strength mu, the
+        signal yields being mu*model.nsignal. The maximum likelihoods of the
+        observed and Asimov data do not depend on the signal normalisation and are
+        computed once, so that each signal strength only costs the profiling of the
+        nuisance parameters at that point. """
+
+    def __init__(self, model, marginalize=False, toys=10000, expected=False):
+        """
+        :param model: a Data object, defining the signal shape
+        :params marginalize: if true, marginalize nuisances, else profile them
+        :params toys: number of toys when marginalizing
+        :params expected: compute the expected values, not the observed ones.
+        """
         if expected:
-            model = copy.deepcopy(oldmodel)
+            model = copy.deepcopy(model)
             #model.observed = model.backgrounds
             for i,d in enumerate(model.backgrounds):
                 model.observed[i]=int(NP.round(d))
-        computer = LikelihoodComputer(model, toys)
-        mu_hat = computer.findMuHat(model.nsignal)
-        theta_hat0,_ = computer.findThetaHat(0*model.nsignal)
-        sigma_mu = computer.getSigmaMu(model.nsignal)
+        self.model = model
+        self.computer = LikelihoodComputer(model, toys)
+        mu_hat = self.computer.findMuHat(model.nsignal)
+        theta_hat0,_ = self.computer.findThetaHat(0*model.nsignal)
 
         aModel = copy.deepcopy(model)
         aModel.observed = array([NP.round(x+y) for x,y in zip(model.backgrounds,theta_hat0)])
-        #print ( "aModeldata=", aModel.observed )
-        #aModel.observed = array ( [ round(x) for x in model.backgrounds ] )
         aModel.name = aModel.name + "A"
-        compA = LikelihoodComputer(aModel, toys)
+        self.compA = LikelihoodComputer(aModel, toys)
         ## compute
-        mu_hatA = compA.findMuHat(aModel.nsignal)
-        # if mu_hat < 0.:
-            # mu_hat = 0.
+        mu_hatA = self.compA.findMuHat(aModel.nsignal)
         # -log L(mu_hat, theta_hat(mu_hat))
-        nll0 = computer.likelihood(model.signals(mu_hat),
-                                        marginalize=marginalize,
-                                        nll=True)
-        if NP.isinf(nll0) and marginalize==False:
+        self.nll0 = self.computer.likelihood(model.signals(mu_hat),
+                                             marginalize=marginalize,
+                                             nll=True)
+        if NP.isinf(self.nll0) and marginalize==False:
             logger.warning("nll is infinite in profiling! we switch to marginalization, but only for this one!" )
             marginalize=True
-            nll0 = computer.likelihood(model.signals(mu_hat),
-                                            marginalize=True,
-                                            nll=True)
-            if NP.isinf(nll0):
+            self.nll0 = self.computer.likelihood(model.signals(mu_hat),
+                                                 marginalize=True,
+                                                 nll=True)
+            if NP.isinf(self.nll0):
                 logger.warning("marginalization didnt help either. switch back.")
                 marginalize=False
             else:
                 logger.warning("marginalization worked.")
-        nll0A = compA.likelihood(aModel.signals(mu_hatA),
-                                    marginalize=marginalize,
-                                    nll=True)
-        
-        # nsig = model.signals(1.)
-        computer.ntot = model.backgrounds + model.nsignal
-        # -log L(mu = 1, theta(1))
-        nll = computer.likelihood(model.nsignal, marginalize=marginalize, nll=True )
-        nllA = compA.likelihood(model.nsignal, marginalize=marginalize, nll=True )
-        qmu =  2*( nll - nll0 )
+        self.marginalize = marginalize
+        self.nll0A = self.compA.likelihood(aModel.signals(mu_hatA),
+                                           marginalize=marginalize,
+                                           nll=True)
+
+    def CLs(self, mu):
+        """ exclusion confidence level (1-CLs) for a single signal strength """
+        nsig = self.model.signals(mu)
+        self.computer.ntot = self.model.backgrounds + nsig
+        # -log L(mu, theta(mu))
+        nll = self.computer.likelihood(nsig, marginalize=self.marginalize, nll=True )
+        nllA = self.compA.likelihood(nsig, marginalize=self.marginalize, nll=True )
+        qmu =  2*( nll - self.nll0 )
         if qmu<0.: qmu=0.
         sqmu = sqrt (qmu)
-        qA =  2*( nllA - nll0A )
-        # print ( "mu: %s, qMu: %s, qA: %s nll0A: %s nllA: %s" % ( mu, qmu, qA, nll0A, nllA ) )
+        qA =  2*( nllA - self.nll0A )
         if qA<0.:
             qA=0.
         sqA = sqrt(qA)
@@ -927,11 +949,19 @@ class CLsComputer:
             else:
                 CLsb = 1. - stats.multivariate_normal.cdf( (qmu + qA)/(2*sqA) )
                 CLb = 1. - stats.multivariate_normal.cdf( (qmu - qA)/(2*sqA) )
-        # CLs = 0.
-        # if CLb > 0.:
         CLs = CLsb/CLb if CLb > 0. else 1.
         return 1 - CLs
 
+    def computeCLs(self, mu):
+        """ exclusion confidence levels (1-CLs) for one or several signal strengths
+
+        :param mu: signal strength, or list/array of signal strengths
+        :returns: 1-CLs, as a float or as an array matching mu
+        """
+        if self.model.isScalar(mu):
+            return self.CLs(float(mu))
+        return array([self.CLs(x) for x in mu])
+
 
 if __name__ == "__main__":
     C = [ 18774.2, -2866.97, -5807.3, -4460.52, -2777.25, -1572.97, -846.653, -442.531,
@@ -26,13 +26,46 @@ from __future__ import absolute_import
 from madanalysis.system.user_info          import UserInfo
 from madanalysis.system.config_checker     import ConfigChecker
 from madanalysis.system.detect_manager     import DetectManager
+from madanalysis.system.detect_cache       import DetectCache
 from string_tools                          import StringTools
 from shell_command import ShellCommand
-import logging
+import logging, threading
 import os, json
 
+
+class DetectionLog(logging.Filter):
+    """Holding back the messages of the detections running in worker threads,
+    so that they can be displayed in the usual order."""
+
+    def __init__(self):
+        logging.Filter.__init__(self)
+        self.local   = threading.local()
+        self.records = {}
+
+    def SetPackage(self, package):
+        self.local.package = package
+        if package is not None:
+            self.records[package] = []
+
+    def filter(self, record):
+        package = getattr(self.local, 'package', None)
+        if package is None:
+            return True
+        self.records[package].append(record)
+        return False
+
+
 class CheckUp():
 
+    # Detections relying on the results of other ones (the detections of the
+    # other groups being performed before)
+    dependencies = {'zlib'          : ['gpp'],
+                    'root_graphical': ['root'],
+                    'pad'           : ['root', 'fastjet'],
+                    'padma5'        : ['root', 'fastjet'],
+                    'padsfs'        : ['root', 'fastjet'],
+                    'simplify'      : ['pyhf']}
+
     def __init__(self,archi_info,session_info,debug,script):
         self.user_info    = UserInfo()
         self.archi_info   = archi_info
@@ -285,44 +318,75 @@ class CheckUp():
             return False
         return True
 
+    def CheckPackages(self, stage, checks):
+        # Restoring the results of a previous detection in the same environment
+        cache = DetectCache(self.archi_info, self.session_info, stage)
+        if not self.debug and cache.Restore():
+            return True
+
+        # Detection
+        cache.Start()
+        for check in checks:
+            if not check():
+                cache.Abort()
+                return False
+        cache.Save()
+        return True
+
+    def ExecuteDetections(self, packages):
+        # The detections (mostly waiting for subprocesses) run in a pool of threads,
+        # each of them starting once the detections it depends on are over
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        log = DetectionLog()
+        def detect(package):
+            log.SetPackage(package)
+            try:
+                return self.checker.Execute(package)
+            finally:
+                log.SetPackage(None)
+
+        results = {}
+        pending = list(packages)
+        running = {}
+        self.logger.addFilter(log)
+        try:
+            with ThreadPoolExecutor(max_workers=len(packages)) as executor:
+                while pending or running:
+                    for package in list(pending):
+                        needed = [x for x in CheckUp.dependencies.get(package,[]) if x in packages]
+                        if all([x in results for x in needed]):
+                            pending.remove(package)
+                            running[executor.submit(detect, package)] = package
+                    done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[running.pop(future)] = future.result()
+        finally:
+            self.logger.removeFilter(log)
+
+        # Displaying the messages in the order of the packages (up to the first failure)
+        for package in packages:
+            for record in log.records.get(package,[]):
+                self.logger.handle(record)
+            if not results[package]:
+                return False
+        return True
+
     def CheckMandatoryPackages(self):
         # Mandatory packages
         self.logger.info("Checking mandatory packages:")
-
-        if not self.checker.Execute('python'):
-            return False
-        if not self.checker.Execute('gpp'):
-            return False
-        if not self.checker.Execute('make'):
-            return False
-        return True
+        return self.ExecuteDetections(['python', 'gpp', 'make'])
 
     def CheckOptionalGraphicalPackages(self):
         # Optional packages
         self.logger.info("Checking optional packages devoted to histogramming:")
-
-        if not self.checker.Execute('root_graphical'):
-            return False
-        if not self.checker.Execute('matplotlib'):
-            return False
-        if not self.checker.Execute('gnuplot'):
-            return False
-        if not self.checker.Execute('pdflatex'):
-            return False
-        if not self.checker.Execute('latex'):
-            return False
-        return True
+        return self.ExecuteDetections(['root_graphical', 'matplotlib', 'gnuplot', 'pdflatex', 'latex'])
 
     def CheckOptionalProcessingPackages(self):
         # Optional packages
         self.logger.info("Checking optional packages devoted to data processing:")
         checker2 = ConfigChecker(self.archi_info, self.user_info, self.session_info, self.script, self.debug)
 
-        if not self.checker.Execute('zlib'):
-            return False
-        if not self.checker.Execute('fastjet'):
-            return False
-        if not self.checker.Execute('root'):
+        if not self.ExecuteDetections(['zlib', 'fastjet', 'root']):
             return False
 
         self.archi_info.has_delphes           = checker2.checkDelphes()
@@ -333,20 +397,7 @@ class CheckUp():
     def CheckOptionalReinterpretationPackages(self):
         # Optional packages
         self.logger.info("Checking optional packages devoted to reinterpretation:")
-
-        if not self.checker.Execute('scipy'):
-            return False
-        if not self.checker.Execute('pad'):
-            return False
-        if not self.checker.Execute('padma5'):
-            return False
-        if not self.checker.Execute('padsfs'):
-            return False
-        if not self.checker.Execute('pyhf'):
-            return False
-        if not self.checker.Execute('simplify'):
-            return False
-        return True
+        return self.ExecuteDetections(['scipy', 'pad', 'padma5', 'padsfs', 'pyhf', 'simplify'])
 
 
     def CreateSymLink(self,source,destination):
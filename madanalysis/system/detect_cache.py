@@ -0,0 +1,196 @@
+################################################################################
+#
+#  Copyright (C) 2012-2023 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+from __future__ import absolute_import
+import copy, hashlib, json, logging, os, sys
+
+
+class DetectCache():
+    """Cache of the package detection, stored in tools/detection.json.
+
+    The fields of ArchitectureInfo and SessionInfo modified by a detection
+    stage are stored together with the messages it displayed, under a
+    fingerprint of the environment (environment variables, user options,
+    Python version, packages of the tools folder and state of the session
+    before the stage). The entry is used as long as the fingerprint is the
+    same and the files it refers to (detected binaries and libraries, tools
+    and Python folders) are unchanged.
+    """
+
+    version     = 2
+    environment = ['PATH', 'LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH', 'LIBRARY_PATH',
+                   'CPLUS_INCLUDE_PATH', 'C_INCLUDE_PATH', 'PYTHONPATH', 'ROOTSYS',
+                   'CXX', 'CC']
+    programs    = ['g++', 'make', 'root-config', 'fastjet-config', 'gnuplot',
+                   'latex', 'pdflatex', 'dvipdf']
+    # SessionInfo fields which do not depend on the detection
+    volatile    = ['editor', 'username', 'tmpdir', 'downloaddir', 'has_web', 'logger']
+
+    def __init__(self, archi_info, session_info, stage):
+        self.archi_info   = archi_info
+        self.session_info = session_info
+        self.stage        = stage
+        self.filename     = os.path.normpath(archi_info.ma5dir+'/tools/detection.json')
+        self.logger       = logging.getLogger('MA5')
+        self.before       = None
+        self.handler      = None
+        self.messages     = []
+
+    def Snapshot(self):
+        session = dict((k,v) for k,v in self.session_info.__dict__.items() if k not in self.volatile)
+        return {'archi': copy.deepcopy(self.archi_info.__dict__), 'session': copy.deepcopy(session)}
+
+    def Fingerprint(self, snapshot):
+        key = hashlib.sha1()
+        key.update(str([DetectCache.version, self.stage, sys.version, sys.executable]).encode())
+        for name in self.environment:
+            key.update((name+'='+os.environ.get(name,'')+'\n').encode())
+        options = os.path.normpath(self.archi_info.ma5dir+'/madanalysis/input/installation_options.dat')
+        if os.path.isfile(options):
+            with open(options,'rb') as source:
+                key.update(source.read())
+        key.update(str(self.Tools()).encode())
+        key.update(json.dumps(snapshot, sort_keys=True, default=str).encode())
+        return key.hexdigest()
+
+    def Tools(self):
+        tools = os.path.normpath(self.archi_info.ma5dir+'/tools')
+        return sorted([os.path.join(tools,x) for x in os.listdir(tools) if os.path.isdir(os.path.join(tools,x))])
+
+    def Stamps(self, fields):
+        ## Files whose modification invalidates the entry
+        paths = set()
+        def collect(value):
+            if isinstance(value, dict):
+                for item in value.values():
+                    collect(item)
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    collect(item)
+            elif isinstance(value, str):
+                for item in value.split(':'):
+                    if item.startswith('/') and os.path.exists(item):
+                        paths.add(os.path.normpath(item))
+        collect(fields)
+        paths.update(self.Tools())
+        ## Python folders (the MadAnalysis 5 folders are already covered by the tools folders)
+        ma5dir = os.path.normpath(self.archi_info.ma5dir)
+        for item in sys.path:
+            if item=='' or not os.path.isdir(item):
+                continue
+            item = os.path.abspath(item)
+            if item!=ma5dir and not item.startswith(ma5dir+os.sep):
+                paths.add(item)
+        from shutil import which
+        for program in self.programs:
+            path = which(program)
+            if path is not None:
+                paths.add(os.path.realpath(path))
+        stamps = {}
+        for path in sorted(paths):
+            try:
+                stat = os.stat(path)
+                stamps[path] = [stat.st_mtime, stat.st_size]
+            except OSError:
+                pass
+        return stamps
+
+    def Read(self):
+        try:
+            with open(self.filename,'r') as source:
+                entries = json.load(source)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict) or entries.get('version',None)!=DetectCache.version:
+            return {}
+        return entries
+
+    def Restore(self):
+        self.before = self.Snapshot()
+        entry = self.Read().get(self.stage, None)
+        if entry is None or entry.get('fingerprint',None)!=self.Fingerprint(self.before):
+            return False
+        for path, stamp in entry['stamps'].items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if [stat.st_mtime, stat.st_size]!=stamp:
+                return False
+
+        ## Restoring the detected configuration
+        for key, value in entry['archi'].items():
+            setattr(self.archi_info, key, value)
+        for key, value in entry['session'].items():
+            setattr(self.session_info, key, value)
+        for path in entry['sys_path']:
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        for level, message in entry['messages']:
+            self.logger.log(level, message)
+        self.logger.debug('Package detection ('+self.stage+') restored from '+self.filename)
+        return True
+
+    def Start(self):
+        ## Recording the displayed messages and the initial state
+        if self.before is None:
+            self.before = self.Snapshot()
+        self.sys_path = list(sys.path)
+        self.messages = []
+        class Recorder(logging.Handler):
+            def emit(handler, record):
+                if record.levelno>=logging.INFO:
+                    self.messages.append([record.levelno, record.getMessage()])
+        self.handler = Recorder()
+        self.logger.addHandler(self.handler)
+
+    def Save(self):
+        self.logger.removeHandler(self.handler)
+        after  = self.Snapshot()
+        fields = {}
+        for category in ['archi', 'session']:
+            fields[category] = dict((k,v) for k,v in after[category].items()
+                                    if self.before[category].get(k,None)!=v)
+        entry = {'fingerprint': self.Fingerprint(self.before),
+                 'archi'      : fields['archi'],
+                 'session'    : fields['session'],
+                 'sys_path'   : [x for x in sys.path if x not in self.sys_path],
+                 'messages'   : self.messages,
+                 'stamps'     : self.Stamps(fields)}
+        entries = self.Read()
+        entries['version']  = DetectCache.version
+        entries[self.stage] = entry
+        try:
+            with open(self.filename+'.tmp','w') as output:
+                json.dump(entries, output, indent=1)
+            os.replace(self.filename+'.tmp', self.filename)
+        except (IOError, OSError, TypeError, ValueError) as err:
+            self.logger.debug('Impossible to store the package detection in '+self.filename+': '+str(err))
+            return False
+        return True
+
+    def Abort(self):
+        if self.handler is not None:
+            self.logger.removeHandler(self.handler)
+            self.handler = None